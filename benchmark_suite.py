@@ -0,0 +1,343 @@
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from core import registry
+from core.batch import BatchFormatter
+from core.formatter import CodeFormatter
+from core.language_manager import LanguageManager
+from core.metrics import PHASES, MetricsAggregator, percentile
+
+# The cold start measured: `main.py --check` of one Java file
+COLD_START_ARGUMENTS = ['main.py', '--input', 'examples/input.java', '--check']
+# Its wall time, interpreter start to exit, fastest of the runs
+COLD_START_BUDGET_MS = 60
+# Modules that run has no use for; importing any of them is a regression
+COLD_START_UNNEEDED = ['core.cache', 'core.printer', 'core.batch', 'core.daemon', 'core.archive',
+                       'core.reports', 'core.watch', 'logging',
+                       'config.rules.python_rules', 'config.rules.cpp_rules']
+# Peak resident memory of `main.py --stream`, whatever the size of the file
+STREAM_RSS_BUDGET_MB = 128
+
+def write_large_java_file(path, size_mb):
+    """Write an unformatted Java class of about size_mb to path"""
+    method = ("    public int m{i}(int a,int b){{\n        int x=a+b;\n        if(x>10){{\n"
+              "            x=x*2;\n        }}\n        return x;\n    }}\n\n")
+    with open(path, 'w') as f:
+        f.write("public class Big {\n")
+        i = 0
+        while f.tell() < size_mb * 1024 * 1024:
+            f.write(''.join(method.format(i=i + j) for j in range(1000)))
+            i += 1000
+        f.write("}\n")
+
+class FormatterBenchmarkSuite:
+    def __init__(self, tiny_files=10000, paths=None, large_file_mb=8, pool_files=2000):
+        self.tiny_files = tiny_files
+        self.pool_files = pool_files
+        self.paths = paths or ['examples/input.java', 'examples/input.py', 'examples/input.cpp']
+        self.large_file_mb = large_file_mb
+        self.results = {}
+
+    def run_benchmarks(self):
+        """Run every benchmark and print a summary"""
+        print("⏱️  FORMATTER BENCHMARK SUITE")
+        print("=" * 70)
+
+        self.results['tiny_files'] = self.benchmark_tiny_files()
+        self.results['pool_batching'] = self.benchmark_pool_batching(self.pool_files)
+        self.results['phases'] = self.benchmark_phases()
+        self.results['construction'] = self.benchmark_construction()
+        self.results['cold_start'] = self.benchmark_cold_start()
+        self.results['line_ranges'] = self.benchmark_line_ranges()
+        self.results['large_file'] = self.benchmark_large_file(self.large_file_mb)
+
+        self._generate_report()
+
+    def benchmark_tiny_files(self):
+        """Per-file overhead on many one-line files, silent vs. with diagnostics logged"""
+        print(f"📁 Formatting {self.tiny_files} tiny Java files...")
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for i in range(self.tiny_files):
+                path = os.path.join(directory, f"tiny_{i}.java")
+                with open(path, 'w') as f:
+                    f.write(f"int x{i}=a+b;")
+                paths.append(path)
+
+            formatter = CodeFormatter(language='java')
+            silent = self._time_files(formatter, paths)
+
+            # What library use cost when every file wrote its progress lines
+            handler = logging.FileHandler(os.path.join(directory, 'diagnostics.log'))
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            core_logger = logging.getLogger('core')
+            core_logger.addHandler(handler)
+            core_logger.setLevel(logging.DEBUG)
+            try:
+                verbose = self._time_files(formatter, paths)
+            finally:
+                core_logger.removeHandler(handler)
+                handler.close()
+                core_logger.setLevel(logging.NOTSET)
+
+        return {
+            'files': len(paths),
+            'silent_us_per_file': silent / len(paths) * 1e6,
+            'verbose_us_per_file': verbose / len(paths) * 1e6,
+        }
+
+    def benchmark_pool_batching(self, files=2000, jobs=2):
+        """Throughput of BatchFormatter's pool on many tiny files, packed into chunks vs. a task per file"""
+        print(f"📦 Formatting {files} tiny Java files across {jobs} workers...")
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for i in range(files):
+                path = os.path.join(directory, f"tiny_{i}.java")
+                with open(path, 'w') as f:
+                    f.write(f"int x{i}=a+b;")
+                paths.append(path)
+
+            results = {'files': files, 'jobs': jobs}
+            for label, small_file_bytes in (('chunked', 2 * 1024), ('per_file', 0)):
+                batch = BatchFormatter(jobs=jobs, edits=True, small_file_bytes=small_file_bytes)
+                start_time = time.perf_counter()
+                batch.format_paths(paths)
+                results[f'{label}_files_per_s'] = files / (time.perf_counter() - start_time)
+                if batch.seconds_per_byte:
+                    results['ns_per_byte'] = batch.seconds_per_byte * 1e9
+        return results
+
+    def benchmark_phases(self):
+        """Per-phase percentiles over self.paths, one warm formatter per language"""
+        print(f"🔬 Collecting phase metrics for {len(self.paths)} file(s)...")
+        language_manager = LanguageManager()
+        formatters = {}
+        aggregator = MetricsAggregator()
+        for path in self.paths:
+            language = language_manager.detect_language(path)
+            if language not in formatters:
+                formatters[language] = CodeFormatter(language=language)
+            aggregator.add(formatters[language].format_file(path, metrics=True))
+        return aggregator.summary()
+
+    def benchmark_construction(self, sources=3000):
+        """Formatter construction cost, and a formatter per file vs. one shared formatter"""
+        print(f"🏗️  Timing formatter construction over {sources} sources...")
+        codes = [f"int x{i}=a+b;" for i in range(sources)]
+        results = {}
+
+        start_time = time.perf_counter()
+        for _ in codes:
+            registry.clear()
+            CodeFormatter(language='java')
+        results['cold_construct_us'] = (time.perf_counter() - start_time) / sources * 1e6
+
+        start_time = time.perf_counter()
+        for _ in codes:
+            CodeFormatter(language='java')
+        results['warm_construct_us'] = (time.perf_counter() - start_time) / sources * 1e6
+
+        # A cold formatter per file pays for every first-use compile again
+        for engine in ('patch', 'printer'):
+            start_time = time.perf_counter()
+            for code in codes:
+                registry.clear()
+                CodeFormatter(language='java', engine=engine).format_source(code)
+            results[f'{engine}_cold_per_file_us'] = (time.perf_counter() - start_time) / sources * 1e6
+
+            formatter = registry.get_formatter('java', engine=engine)
+            start_time = time.perf_counter()
+            for code in codes:
+                formatter.format_source(code)
+            results[f'{engine}_shared_per_file_us'] = (time.perf_counter() - start_time) / sources * 1e6
+        return results
+
+    def benchmark_cold_start(self, runs=20):
+        """Wall time and import profile of a cold single-file `main.py --check`"""
+        print(f"🧊 Timing {runs} cold CLI runs...")
+        root = os.path.dirname(os.path.abspath(__file__))
+        wall_ms = []
+        for _ in range(runs):
+            start_time = time.perf_counter()
+            subprocess.run([sys.executable] + COLD_START_ARGUMENTS, cwd=root,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            wall_ms.append((time.perf_counter() - start_time) * 1000)
+        wall_ms.sort()
+
+        imports = self.cold_start_imports()
+        return {
+            'runs': runs,
+            'wall_ms_p50': percentile(wall_ms, 50),
+            'wall_ms_min': wall_ms[0],
+            'import_ms': sum(imports.values()) / 1000,
+            'slowest_imports': sorted(imports.items(), key=lambda item: -item[1])[:5],
+            'unneeded_imports': [name for name in COLD_START_UNNEEDED if name in imports],
+            # Without cached bytecode every run also compiles every module it imports
+            'bytecode_cached': not sys.flags.dont_write_bytecode,
+        }
+
+    def cold_start_imports(self):
+        """{module: self time in µs} of every module a cold `main.py --check` imports, from -X importtime"""
+        root = os.path.dirname(os.path.abspath(__file__))
+        profile = subprocess.run([sys.executable, '-X', 'importtime'] + COLD_START_ARGUMENTS, cwd=root,
+                                 capture_output=True, text=True).stderr
+        imports = {}
+        for line in profile.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            self_us, _, name = line[len('import time:'):].split('|')
+            if self_us.strip().isdigit():
+                imports[name.strip()] = int(self_us)
+        return imports
+
+    def benchmark_line_ranges(self, methods=5000, hunk=30, runs=20):
+        """A hunk of a ~40k-line file via --lines, against the whole file and a file the hunk's size"""
+        method = ("    public int m{i}(int a,int b){{\n        int x=a+b;\n        if(x>10){{\n"
+                  "            x=x*2;\n        }}\n        return x;\n    }}\n\n")
+        big = "public class Big {\n" + ''.join(method.format(i=i) for i in range(methods)) + "}\n"
+        small = "public class Small {\n" + ''.join(method.format(i=i) for i in range(hunk // 8)) + "}\n"
+        total_lines = big.count('\n')
+        lines = [(total_lines // 2, total_lines // 2 + hunk - 1)]
+        print(f"✂️  Formatting {hunk} of {total_lines} lines...")
+
+        results = {'total_lines': total_lines, 'hunk_lines': hunk}
+        for engine in ('patch', 'printer'):
+            formatter = CodeFormatter(language='java', engine=engine)
+            start_time = time.perf_counter()
+            formatter.format_source(big)
+            results[f'{engine}_whole_ms'] = (time.perf_counter() - start_time) * 1000
+
+            start_time = time.perf_counter()
+            for _ in range(runs):
+                formatter.format_source_lines(big, lines)
+            results[f'{engine}_range_ms'] = (time.perf_counter() - start_time) / runs * 1000
+
+            start_time = time.perf_counter()
+            for _ in range(runs):
+                formatter.format_source(small)
+            results[f'{engine}_small_ms'] = (time.perf_counter() - start_time) / runs * 1000
+        return results
+
+    def benchmark_large_file(self, size_mb=8, whole_mb=1):
+        """Peak RSS and throughput of `main.py --stream` on a size_mb file, against reading whole_mb whole"""
+        print(f"🐘 Streaming a {size_mb} MB file...")
+        root = os.path.dirname(os.path.abspath(__file__))
+        results = {'size_mb': size_mb, 'whole_mb': whole_mb}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = {}
+            for label, mb in (('stream', size_mb), ('whole', whole_mb)):
+                paths[label] = os.path.join(tmpdir, f'{label}.java')
+                write_large_java_file(paths[label], mb)
+            output = os.path.join(tmpdir, 'out.java')
+            for engine in ('patch', 'printer'):
+                for label, flags in (('stream', ['--stream']), ('whole', [])):
+                    arguments = ['main.py', '--input', paths[label], '--output', output, '--engine', engine] + flags
+                    start_time = time.perf_counter()
+                    results[f'{engine}_{label}_rss_mb'] = self._peak_rss_mb([sys.executable] + arguments, root)
+                    results[f'{engine}_{label}_s'] = time.perf_counter() - start_time
+        return results
+
+    def _peak_rss_mb(self, command, cwd):
+        """Run command and return its peak resident memory in MB"""
+        process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return usage.ru_maxrss / 1024  # kilobytes on Linux
+
+    def _time_files(self, formatter, paths):
+        start_time = time.perf_counter()
+        for path in paths:
+            formatter.format_file(path)
+        return time.perf_counter() - start_time
+
+    def _generate_report(self):
+        """Print the collected measurements"""
+        print("\n" + "=" * 70)
+        print("📈 BENCHMARK RESULTS")
+        print("=" * 70)
+
+        tiny = self.results.get('tiny_files')
+        if tiny:
+            print(f"\n📁 TINY FILES ({tiny['files']} files):")
+            print(f"   🔇 Silent (library default): {tiny['silent_us_per_file']:8.1f} µs/file")
+            print(f"   🔊 Diagnostics logged:       {tiny['verbose_us_per_file']:8.1f} µs/file")
+
+        pool = self.results.get('pool_batching')
+        if pool:
+            print(f"\n📦 POOL BATCHING ({pool['files']} tiny files, {pool['jobs']} workers):")
+            print(f"   Packed into chunks: {pool['chunked_files_per_s']:8.0f} files/s "
+                  f"(tuned at {pool['ns_per_byte']:.0f} ns/byte)")
+            print(f"   One task per file:  {pool['per_file_files_per_s']:8.0f} files/s")
+
+        construction = self.results.get('construction')
+        if construction:
+            print(f"\n🏗️  FORMATTER CONSTRUCTION:")
+            print(f"   Construct, components cold:      {construction['cold_construct_us']:8.1f} µs")
+            print(f"   Construct, registry warm:        {construction['warm_construct_us']:8.1f} µs")
+            for engine in ('patch', 'printer'):
+                print(f"   Per file ({engine:<7}), cold each: {construction[f'{engine}_cold_per_file_us']:8.1f} µs")
+                print(f"   Per file ({engine:<7}), shared:    {construction[f'{engine}_shared_per_file_us']:8.1f} µs")
+
+        cold = self.results.get('cold_start')
+        if cold:
+            status = "✅" if cold['wall_ms_min'] <= COLD_START_BUDGET_MS and not cold['unneeded_imports'] else "❌"
+            print(f"\n🧊 COLD START (main.py --check, {cold['runs']} runs):")
+            print(f"   {status} Wall time min: {cold['wall_ms_min']:6.1f} ms (p50 {cold['wall_ms_p50']:.1f}, "
+                  f"budget {COLD_START_BUDGET_MS} ms)")
+            print(f"   Imports (-X importtime, self total): {cold['import_ms']:6.1f} ms")
+            for name, self_us in cold['slowest_imports']:
+                print(f"      {name:<28} {self_us / 1000:6.1f} ms")
+            if cold['unneeded_imports']:
+                print(f"   ❌ Imported without need: {', '.join(cold['unneeded_imports'])}")
+            if not cold['bytecode_cached']:
+                print("   ⚠️  PYTHONDONTWRITEBYTECODE is set: modules without up-to-date bytecode are compiled on every run")
+
+        ranges = self.results.get('line_ranges')
+        if ranges:
+            print(f"\n✂️  LINE RANGES ({ranges['hunk_lines']} of {ranges['total_lines']} lines):")
+            for engine in ('patch', 'printer'):
+                print(f"   {engine:<7} whole file {ranges[f'{engine}_whole_ms']:8.1f} ms | "
+                      f"--lines {ranges[f'{engine}_range_ms']:6.2f} ms | "
+                      f"{ranges['hunk_lines']}-line file {ranges[f'{engine}_small_ms']:6.2f} ms")
+
+        large = self.results.get('large_file')
+        if large:
+            print(f"\n🐘 LARGE FILE (--stream on {large['size_mb']} MB, whole file on {large['whole_mb']} MB):")
+            for engine in ('patch', 'printer'):
+                rss = large[f'{engine}_stream_rss_mb']
+                status = "✅" if rss <= STREAM_RSS_BUDGET_MB else "❌"
+                print(f"   {status} {engine:<7} --stream peak RSS {rss:7.1f} MB (budget {STREAM_RSS_BUDGET_MB} MB), "
+                      f"{large['size_mb'] / large[f'{engine}_stream_s']:5.2f} MB/s | "
+                      f"whole file peak RSS {large[f'{engine}_whole_rss_mb']:7.1f} MB")
+
+        for language, summary in self.results.get('phases', {}).items():
+            print(f"\n🔬 PHASES: {language} ({summary['files']} files, {summary['bytes_in']} bytes in)")
+            print(f"   {'phase':<12} {'p50 µs':>10} {'p95 µs':>10} {'p99 µs':>10}")
+            for phase in PHASES + ['total_ns']:
+                stats = summary[phase]
+                print(f"   {phase[:-3]:<12} {stats['p50'] / 1000:10.1f} {stats['p95'] / 1000:10.1f} {stats['p99'] / 1000:10.1f}")
+
+def main():
+    """Run the benchmark suite"""
+    parser = argparse.ArgumentParser(description='Run the formatter benchmarks')
+    parser.add_argument('--tiny-files', type=int, default=10000,
+                        help='Number of files for the per-file overhead benchmark')
+    parser.add_argument('--paths', nargs='+',
+                        help='Source files for the phase breakdown (default: examples/input.*)')
+    parser.add_argument('--large-file-mb', type=int, default=8,
+                        help='Size of the file for the --stream peak-RSS benchmark')
+    parser.add_argument('--pool-files', type=int, default=2000,
+                        help='Number of files for the pool batching benchmark; 100000 for a full-scale run, '
+                             'which takes minutes')
+    args = parser.parse_args()
+
+    suite = FormatterBenchmarkSuite(tiny_files=args.tiny_files, paths=args.paths,
+                                    large_file_mb=args.large_file_mb, pool_files=args.pool_files)
+    suite.run_benchmarks()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Thin client for the formatter daemon (main.py --serve SOCKET)
+
+Uses only the standard library and imports nothing from the formatter, so
+a request costs interpreter startup plus a socket round trip instead of a
+full cold start. Meant for editors and pre-commit hooks:
+
+    python main.py --serve /tmp/formatter.sock &
+    python client.py --socket /tmp/formatter.sock --check src/A.java src/B.py
+    python client.py --socket /tmp/formatter.sock src/A.java > A.formatted.java
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+
+DEFAULT_SOCKET = os.environ.get('FORMATTER_SOCKET', '/tmp/formatter.sock')
+
+class FormatterClient:
+    """One connection to the daemon; requests are answered in order"""
+
+    def __init__(self, socket_path=DEFAULT_SOCKET, timeout=30):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self.reader = self.sock.makefile('rb')
+        self.next_id = 0
+
+    def request(self, op, source=None, language=None, path=None, converge=False, lines=None):
+        """Send one request and return the decoded response"""
+        self.next_id += 1
+        request = {'id': self.next_id, 'op': op, 'source': source, 'converge': converge}
+        if language:
+            request['language'] = language
+        if path:
+            request['path'] = path
+        if lines:
+            request['lines'] = lines
+        self.sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('Formatter daemon closed the connection')
+        return json.loads(line)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Format files through a running formatter daemon')
+    parser.add_argument('files', nargs='+', help="Files to format ('-' reads stdin)")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help='Daemon socket (default: $FORMATTER_SOCKET)')
+    parser.add_argument('--language', choices=['java', 'python', 'cpp'],
+                        help='Language, instead of detecting it from each file name')
+    parser.add_argument('--check', action='store_true',
+                        help='Print nothing; exit 1 if any file would change')
+    parser.add_argument('--edits', action='store_true',
+                        help='Print the edits for each file as JSON lines')
+    parser.add_argument('--converge', action='store_true',
+                        help='Re-run formatting until the output is stable')
+    parser.add_argument('--lines', action='append', metavar='START-END',
+                        help='Only format these lines (1-based, inclusive); may be repeated')
+    args = parser.parse_args()
+
+    lines = []
+    for text in args.lines or []:
+        first, _, last = text.partition('-')
+        if not (first.isdigit() and (last or first).isdigit()):
+            parser.error(f"argument --lines: invalid line range '{text}', expected START-END")
+        lines.append([int(first), int(last or first)])
+
+    try:
+        client = FormatterClient(args.socket)
+    except OSError as e:
+        print(f"❌ Cannot reach formatter daemon at {args.socket}: {e}", file=sys.stderr)
+        return 2
+
+    op = 'check' if args.check else 'edits' if args.edits else 'format'
+    changed = False
+    try:
+        for path in args.files:
+            if path == '-':
+                source = sys.stdin.read()
+            else:
+                with open(path, 'r') as f:
+                    source = f.read()
+            response = client.request(op, source, args.language, None if path == '-' else path,
+                                      args.converge, lines)
+            if not response.get('ok'):
+                print(f"❌ {path}: {response.get('error')}", file=sys.stderr)
+                return 2
+            if op == 'check':
+                changed = changed or response['changed']
+            elif op == 'edits':
+                print(json.dumps({'path': path, 'edits': response['edits']}))
+            else:
+                sys.stdout.write(response['formatted_code'])
+    except OSError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    finally:
+        client.close()
+
+    return 1 if changed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,15 @@
-# Rules package for code formatting
-from .java_rules import JAVA_RULES
-from .python_rules import PYTHON_RULES
-from .cpp_rules import CPP_RULES
+# Rules package for code formatting; each table is imported on first access
+import importlib
 
-__all__ = ['JAVA_RULES', 'PYTHON_RULES', 'CPP_RULES']
\ No newline at end of file
+_RULE_MODULES = {
+    'JAVA_RULES': '.java_rules',
+    'PYTHON_RULES': '.python_rules',
+    'CPP_RULES': '.cpp_rules',
+}
+
+__all__ = ['JAVA_RULES', 'PYTHON_RULES', 'CPP_RULES']
+
+def __getattr__(name):
+    if name in _RULE_MODULES:
+        return getattr(importlib.import_module(_RULE_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,131 @@
+import asyncio
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.fileio import shared_memory_dir
+
+from .batch import (SHARED_TEXT_BYTES, BatchFormatter, _error_result, _init_worker, _share_text,
+                    _shared_source_task, _unshare_result)
+
+_EXHAUSTED = object()
+
+class AsyncBatchFormatter:
+    """asyncio front end for formatting many files or sources
+
+    File reads run on the loop's default thread pool and formatting on a
+    bounded process pool, so the event loop itself only schedules work.
+    A semaphore shared by every call limits how many items are in flight
+    at once, which also bounds memory when several batches run
+    concurrently. Results are yielded as they complete. Large sources and
+    result texts go to and from the pool as SharedTexts, like
+    BatchFormatter's, in a directory that lives until close().
+
+        async with AsyncBatchFormatter(jobs=4) as formatter:
+            async for path, result in formatter.format_paths(paths):
+                ...
+
+    Keyword arguments are the BatchFormatter options (jobs, language,
+    style, engine, converge, max_iterations, edits, metrics, cache_dir,
+    cache_max_bytes).
+    """
+
+    def __init__(self, max_in_flight=None, **options):
+        self.batch = BatchFormatter(**options)
+        self.max_in_flight = max_in_flight or 2 * self.batch.jobs
+        self._semaphore = None
+        self._executor = None
+        self._shared_dir = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut the worker pool down"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._shared_dir is not None:
+            self._shared_dir.cleanup()
+            self._shared_dir = None
+
+    async def format_paths(self, paths):
+        """Yield (path, result) for each path, in completion order"""
+        async for item in self._run(paths, self._format_path):
+            yield item
+
+    async def format_sources(self, sources, language=None):
+        """Yield (index, result) for each source string, in completion order"""
+        language = language or self.batch.language or 'java'
+        async for item in self._run(enumerate(sources), lambda item: self._format_source(item, language)):
+            yield item
+
+    async def _run(self, items, work):
+        """Run work over items with at most max_in_flight tasks, yielding as they finish"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        items = iter(items)
+        pending = set()
+        exhausted = False
+        try:
+            while True:
+                # Only create as many tasks as could run; the rest of a large batch waits in the iterator
+                while not exhausted and len(pending) < self.max_in_flight:
+                    item = next(items, _EXHAUSTED)
+                    if item is _EXHAUSTED:
+                        exhausted = True
+                    else:
+                        pending.add(asyncio.ensure_future(work(item)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _format_path(self, path):
+        loop = asyncio.get_running_loop()
+        language = self.batch.language or self.batch.language_manager.detect_language(path)
+        async with self._semaphore:
+            try:
+                source = await loop.run_in_executor(None, _read_file, path)
+            except (OSError, UnicodeDecodeError) as e:
+                return path, _error_result(e, self.batch.options)
+            result = await self._submit(source, language)
+        return path, result
+
+    async def _format_source(self, item, language):
+        index, source = item
+        async with self._semaphore:
+            result = await self._submit(source, language)
+        return index, result
+
+    async def _submit(self, source, language):
+        """Format source in the pool; large texts are written and read back on the default thread pool"""
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        if len(source) < SHARED_TEXT_BYTES:
+            result = await loop.run_in_executor(executor, _shared_source_task, source, language)
+            return _unshare_result(result)  # only a much longer formatted_code is shared
+        source = await loop.run_in_executor(None, _share_text, self._shared_dir.name, source)
+        result = await loop.run_in_executor(executor, _shared_source_task, source, language)
+        return await loop.run_in_executor(None, _unshare_result, result)
+
+    def _get_executor(self):
+        if self._executor is None:
+            languages = [self.batch.language] if self.batch.language else \
+                self.batch.language_manager.get_supported_languages()
+            self._shared_dir = tempfile.TemporaryDirectory(prefix='formatter-', dir=shared_memory_dir())
+            options = dict(self.batch.options, shared_dir=self._shared_dir.name)
+            self._executor = ProcessPoolExecutor(max_workers=self.batch.jobs, initializer=_init_worker,
+                                                 initargs=(options, languages))
+        return self._executor
+
+def _read_file(path):
+    with open(path, 'r') as f:
+        return f.read()
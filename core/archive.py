@@ -0,0 +1,139 @@
+import copy
+import io
+import os
+
+from utils.fileio import TAR_SUFFIXES, ZIP_SUFFIXES, line_ending
+
+from . import get_logger, registry
+from .batch import source_extensions
+from .edits import apply_edits
+from .formatter import DEFAULT_MAX_ITERATIONS
+
+logger = get_logger(__name__)
+
+# Zip members that are not source files are copied across in pieces of this size
+COPY_BUFFER_BYTES = 1024 * 1024
+
+class ArchiveFormatter:
+    """Format the source files inside zip and tar archives without extracting them
+
+    The archive is read one member at a time and every member, formatted
+    or not, is written to the new archive before the next one is read:
+    only one source member is ever held in memory, other members are
+    copied across in pieces, and nothing touches the disk but the two
+    archives. Tar archives are read and written as streams, so compressed
+    ones are never seeked in. Members are picked and their language
+    detected by file name, like files in a directory are.
+
+        with open('formatted.zip', 'wb') as output:
+            for name, code, result in ArchiveFormatter().format('bundle.zip', output):
+                print(name, len(result['edits']))
+    """
+
+    def __init__(self, language=None, style='google', engine='patch', converge=False,
+                 max_iterations=DEFAULT_MAX_ITERATIONS):
+        self.language = language
+        self.style = style
+        self.engine = engine
+        self.converge = converge
+        self.max_iterations = max_iterations
+        self.extensions = source_extensions(language)
+
+    def format(self, path, output=None):
+        """Yield (member name, original code, result) for every source member of the archive at path
+
+        result is format_source_edits'. The new archive, of the same kind
+        and compression as the old, is written to the binary file object
+        output (seekable for zip) if there is one, and is complete once
+        the generator is exhausted. Source members that are not UTF-8
+        are copied as they are.
+        """
+        if path.lower().endswith(ZIP_SUFFIXES):
+            yield from self._format_zip(path, output)
+        else:
+            yield from self._format_tar(path, output)
+
+    def _format_zip(self, path, output):
+        import shutil
+        import zipfile
+
+        with zipfile.ZipFile(path) as source:
+            target = zipfile.ZipFile(output, 'w') if output is not None else None
+            try:
+                if target is not None:
+                    target.comment = source.comment
+                for info in source.infolist():
+                    if info.is_dir() or not self._is_source(info.filename):
+                        if target is None:
+                            continue
+                        # The original stays untouched: source reads its sizes and CRC
+                        with source.open(info) as reader, target.open(copy.copy(info), 'w') as writer:
+                            shutil.copyfileobj(reader, writer, COPY_BUFFER_BYTES)
+                        continue
+
+                    data = source.read(info)
+                    member = self._format_member(info.filename, data)
+                    if member is not None:
+                        code, result, data = member
+                        yield info.filename, code, result
+                    if target is not None:
+                        target.writestr(copy.copy(info), data)
+            finally:
+                if target is not None:
+                    target.close()
+
+    def _format_tar(self, path, output):
+        import tarfile
+
+        compression = next(TAR_SUFFIXES[suffix] for suffix in sorted(TAR_SUFFIXES, key=len, reverse=True)
+                           if path.lower().endswith(suffix))
+        with tarfile.open(path, 'r|*') as source:
+            target = tarfile.open(fileobj=output, mode='w|' + compression) if output is not None else None
+            try:
+                for info in source:
+                    if not info.isreg() or not self._is_source(info.name):
+                        if target is not None:
+                            target.addfile(info, source.extractfile(info) if info.isreg() else None)
+                        continue
+
+                    data = source.extractfile(info).read()
+                    member = self._format_member(info.name, data)
+                    if member is not None:
+                        code, result, data = member
+                        yield info.name, code, result
+                    if target is not None:
+                        info = copy.copy(info)
+                        info.size = len(data)
+                        target.addfile(info, io.BytesIO(data))
+            finally:
+                if target is not None:
+                    target.close()
+
+    def _is_source(self, name):
+        return os.path.splitext(name)[1].lower() in self.extensions
+
+    def _format_member(self, name, data):
+        """(code, result, new bytes) for the bytes of a source member, or None if they are not UTF-8
+
+        The bytes are only re-encoded if formatting changes something, so
+        an unchanged member keeps its exact content, and a changed one its
+        line endings, unless it mixes several.
+        """
+        try:
+            member = io.StringIO(data.decode('utf-8'), newline=None)
+        except UnicodeDecodeError:
+            logger.warning("⚠️  %s is not UTF-8 text, copied as is", name)
+            return None
+        # Line endings as reading the file in text mode would give them
+        code = member.read()
+        newline = line_ending(member)
+
+        language = self.language or registry.get_language_manager().detect_language(name)
+        formatter = registry.get_formatter(language, self.style, self.engine)
+        result = formatter.format_source_edits(code, self.converge, self.max_iterations)
+        if result['edits']:
+            formatted_code = apply_edits(code, result['edits'])
+            if newline is not None:
+                formatted_code = formatted_code.replace('\n', newline)
+            data = formatted_code.encode('utf-8')
+        return code, result, data
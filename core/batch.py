@@ -0,0 +1,346 @@
+import glob
+import hashlib
+import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from utils.fileio import AtomicFile, SharedText, line_ending, shared_memory_dir, sync_directories
+
+from .cache import DEFAULT_MAX_BYTES, ResultCache
+from .edits import apply_edits
+from .formatter import DEFAULT_MAX_ITERATIONS, CodeFormatter
+from .language_manager import LanguageManager
+
+# Files smaller than this are packed together into pool tasks; larger ones are sent alone
+SMALL_FILE_BYTES = 2 * 1024
+# Seconds of work a pool task of small files is sized for: long enough that pickling and
+# dispatching it are noise, short enough that the workers still finish together
+TARGET_CHUNK_SECONDS = 0.1
+# Bytes in the first tasks of small files, before their per-byte cost has been measured
+INITIAL_CHUNK_BYTES = 16 * 1024
+# Sources and result texts this large go to and from pool workers as SharedTexts, not pickled
+SHARED_TEXT_BYTES = 1024 * 1024
+# Result texts that may be that large
+_SHARED_KEYS = ('original_code', 'formatted_code')
+
+def collect_files(inputs, language=None):
+    """Expand files, directories and glob patterns into a sorted list of source files
+
+    Directories are walked recursively, skipping hidden ones; only files
+    with an extension of a supported language (or of `language`, when
+    given) are picked up from directories and globs. Files named
+    explicitly are always kept.
+    """
+    extensions = source_extensions(language)
+
+    def wanted(path):
+        return os.path.splitext(path)[1].lower() in extensions
+
+    files = set()
+    for item in inputs:
+        if os.path.isfile(item):
+            files.add(item)
+            continue
+        matches = [item] if os.path.isdir(item) else glob.glob(item, recursive=True)
+        for match in matches:
+            if os.path.isfile(match):
+                if wanted(match):
+                    files.add(match)
+                continue
+            for root, dirs, names in os.walk(match):
+                dirs[:] = [d for d in dirs if not d.startswith('.')]
+                files.update(os.path.join(root, name) for name in names if wanted(name))
+    return sorted(files)
+
+def source_extensions(language=None):
+    """File extensions of every supported language, or of just `language`"""
+    language_manager = LanguageManager()
+    languages = [language] if language else language_manager.get_supported_languages()
+    return {ext for lang in languages for ext in language_manager.get_file_extensions(lang)}
+
+def parse_shard(text):
+    """(index, count) for 'K/N', the K-th of N shards; 1-based"""
+    index, _, count = text.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Invalid shard '{text}', expected K/N")
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{text}', expected 1 <= K <= N")
+    return index, count
+
+def shard_paths(paths, index, count):
+    """The paths that belong to shard index of count (1-based), by a stable hash of each path
+
+    The hash is taken over the path relative to the current directory,
+    with '/' separators, so every machine running from the root of the
+    same checkout splits the same files the same way, and every file
+    lands in exactly one shard.
+    """
+    def shard_of(path):
+        name = os.path.relpath(path).replace(os.sep, '/')
+        digest = hashlib.sha1(name.encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') % count
+    return [path for path in paths if shard_of(path) == index - 1]
+
+# Per-process state of pool workers: formatters stay warm across tasks
+_worker_options = {}
+_worker_formatters = {}
+_worker_cache = {}
+
+def _init_worker(options, languages):
+    _worker_options.update(options)
+    _worker_formatters.clear()
+    _worker_cache.clear()
+    if options['cache_dir']:
+        _worker_cache['cache'] = ResultCache(options['cache_dir'], options['cache_max_bytes'])
+    for language in languages:
+        _get_formatter(language)
+
+def _get_formatter(language):
+    formatter = _worker_formatters.get(language)
+    if formatter is None:
+        formatter = CodeFormatter(language=language, style=_worker_options['style'],
+                                  engine=_worker_options['engine'], cache=_worker_cache.get('cache'))
+        _worker_formatters[language] = formatter
+    return formatter
+
+def _format_task(path, language):
+    options = _worker_options
+    formatter = _get_formatter(language)
+    try:
+        if options['in_place']:
+            return _rewrite(formatter, path)
+        if options['edits']:
+            return formatter.format_edits(path, options['converge'], options['max_iterations'])
+        return formatter.format_file(path, options['converge'], options['max_iterations'], options['metrics'])
+    except (OSError, UnicodeDecodeError) as e:
+        # One unreadable file fails alone; the rest of the batch still runs
+        return _error_result(e, options)
+
+def _file_size(path):
+    """Size of path for scheduling; 0 if it cannot be read, which _format_task then reports"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def _error_result(error, options):
+    """Result for a file that could not be read, shaped like the formatter's own fallback"""
+    result = {'issues_found': [], 'formatting_score': 0.0, 'fixes_applied': 0, 'error': str(error)}
+    if options['edits'] or options['in_place']:
+        result['edits'] = []
+    else:
+        result['original_code'] = result['formatted_code'] = ''
+    if options['in_place']:
+        result['written'] = False
+    return result
+
+def _rewrite(formatter, path):
+    """Format path in place, only writing it if it changes; format_source_edits' result plus 'written'"""
+    options = _worker_options
+    with open(path, 'r') as f:
+        original_code = f.read()
+        newline = line_ending(f)
+    result = formatter.format_source_edits(original_code, options['converge'], options['max_iterations'])
+    result['written'] = bool(result['edits'])
+    if result['written']:
+        with AtomicFile(path, options['durable'], newline=newline) as f:
+            f.write(apply_edits(original_code, result['edits']))
+            f.commit()
+    return result
+
+def _timed_task(task, item, language):
+    """task(item, language), with that language and the seconds it took as 'processing_time'"""
+    start_time = time.perf_counter()
+    result = task(item, language)
+    result['language'] = language
+    result['processing_time'] = time.perf_counter() - start_time
+    return result
+
+def _run_chunk(task, chunk):
+    """[(name, result)] of _timed_task for every (name, item, language) of chunk, in a pool worker"""
+    return [(name, _share_result(_timed_task(task, item, language))) for name, item, language in chunk]
+
+def _shared_source_task(source, language):
+    """_format_source_task in a pool worker whose large result texts go back as SharedTexts"""
+    return _share_result(_format_source_task(source, language))
+
+def _share_text(directory, text):
+    """A SharedText of text in directory, or text itself if it cannot be written there"""
+    try:
+        return SharedText(directory, text)
+    except OSError:
+        return text  # e.g. /dev/shm is full: it is pickled like any small text
+
+def _share_result(result):
+    """result with its large texts parked in the runner's shared directory, if it gave workers one"""
+    directory = _worker_options.get('shared_dir')
+    if not directory:
+        return result
+    result = dict(result)
+    shared = {}
+    for key in _SHARED_KEYS:
+        text = result.get(key)
+        if isinstance(text, str) and len(text) >= SHARED_TEXT_BYTES:
+            # Unchanged code is one string under both keys: park it once
+            if id(text) not in shared:
+                shared[id(text)] = _share_text(directory, text)
+            result[key] = shared[id(text)]
+    return result
+
+def _unshare_result(result):
+    """result with the texts _share_result parked read back, and their files removed"""
+    taken = {}
+    for key in _SHARED_KEYS:
+        value = result.get(key)
+        if isinstance(value, SharedText):
+            if id(value) not in taken:
+                taken[id(value)] = value.take()
+            result[key] = taken[id(value)]
+    return result
+
+def _format_source_task(source, language):
+    options = _worker_options
+    if isinstance(source, SharedText):
+        source = source.take()
+    formatter = _get_formatter(language)
+    if options['edits']:
+        return formatter.format_source_edits(source, options['converge'], options['max_iterations'])
+    return formatter.format_source(source, options['converge'], options['max_iterations'], options['metrics'])
+
+class BatchFormatter:
+    """Format many files across a pool of worker processes
+
+    Files are submitted largest first so the longest tasks start early and
+    the batch does not wait on one big file at the end; results are still
+    returned in path order, whatever order the workers finish in.
+
+    Files under small_file_bytes are not worth a task each (pickling and
+    dispatching one costs more than formatting it), so they are packed
+    into tasks sized by bytes for TARGET_CHUNK_SECONDS of work at the
+    per-byte cost measured on the tasks done so far; seconds_per_byte
+    holds the last estimate. small_file_bytes=0 sends every file alone.
+
+    Sources and result texts of SHARED_TEXT_BYTES or more do not go
+    through the pool's pipes: they are parked in files of a directory on
+    shared_memory_dir() that lives as long as the pool, and only their
+    paths are pickled.
+
+    With in_place=True format_paths rewrites every file that changes
+    (through AtomicFile, in the worker that formatted it) and leaves the
+    others untouched; results are edits results plus 'written'. With
+    durable=True too, each file is fsynced before it replaces the old one
+    and every directory written to is fsynced once at the end.
+    """
+
+    def __init__(self, jobs=None, language=None, style='google', engine='patch',
+                 converge=False, max_iterations=DEFAULT_MAX_ITERATIONS, edits=False, metrics=False,
+                 cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES, in_place=False, durable=False,
+                 small_file_bytes=SMALL_FILE_BYTES):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.small_file_bytes = small_file_bytes
+        self.seconds_per_byte = None
+        self.language = language
+        self.language_manager = LanguageManager()
+        self.options = {
+            'style': style,
+            'engine': engine,
+            'converge': converge,
+            'max_iterations': max_iterations,
+            'edits': edits,
+            'metrics': metrics,
+            'cache_dir': cache_dir,
+            'cache_max_bytes': cache_max_bytes,
+            'in_place': in_place,
+            'durable': durable,
+        }
+
+    def format_paths(self, paths):
+        """Return [(path, result)] sorted by path"""
+        results = self._run(_format_task, [(path, path, _file_size(path)) for path in paths])
+        if self.options['in_place'] and self.options['durable']:
+            sync_directories([path for path, result in results if result['written']])
+        return results
+
+    def format_sources(self, sources):
+        """Return [(name, result)] sorted by name for (name, source) pairs
+
+        For code that is not in a file of its own, e.g. blobs read from git;
+        the language is detected from each name.
+        """
+        return self._run(_format_source_task, [(name, source, len(source)) for name, source in sources], texts=True)
+
+    def _run(self, task, items, texts=False):
+        """task(item, language) for every (name, item, size), submitted largest first
+
+        texts says the items are code rather than paths.
+        """
+        items = sorted(items, key=lambda item: item[2], reverse=True)
+        tasks = [(name, item, self.language or self.language_manager.detect_language(name), size)
+                 for name, item, size in items]
+        languages = sorted({language for _, _, language, _ in tasks})
+
+        if self.jobs == 1 or len(tasks) <= 1:
+            _init_worker(self.options, languages)
+            results = {name: _timed_task(task, item, language) for name, item, language, _ in tasks}
+        else:
+            results = self._run_pool(task, tasks, languages, texts)
+
+        if self.options['cache_dir']:
+            # Workers only evict as they write; settle the size once at the end
+            ResultCache(self.options['cache_dir'], self.options['cache_max_bytes']).evict()
+        return sorted(results.items())
+
+    def _run_pool(self, task, tasks, languages, texts):
+        """{name: result} for (name, item, language, size) tasks, largest first, across the pool
+
+        Large files are all submitted at once, alone. Small ones are packed
+        into chunks as the pool drains, at most two per worker in flight,
+        so every chunk is sized with the latest per-byte estimate.
+        """
+        workers = min(self.jobs, len(tasks))
+        small = deque(entry for entry in tasks if entry[3] < self.small_file_bytes)
+        remaining = sum(size for _, _, _, size in small)
+        measured_bytes = measured_seconds = 0
+        results = {}
+        # The pool shuts down before the directory, and whatever workers left in it, goes
+        with tempfile.TemporaryDirectory(prefix='formatter-', dir=shared_memory_dir()) as shared_dir, \
+                ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                    initargs=(dict(self.options, shared_dir=shared_dir), languages)) as executor:
+            futures = []
+            for name, item, language, size in tasks:
+                if size >= self.small_file_bytes:
+                    if texts and size >= SHARED_TEXT_BYTES:
+                        item = _share_text(shared_dir, item)
+                    futures.append(executor.submit(_run_chunk, task, [(name, item, language)]))
+            chunks = {}
+            while small or chunks:
+                while small and len(chunks) < 2 * workers:
+                    if not self.seconds_per_byte:
+                        target = INITIAL_CHUNK_BYTES
+                    else:
+                        target = TARGET_CHUNK_SECONDS / self.seconds_per_byte
+                    # Never so large that the last chunks leave workers idle
+                    target = min(target, remaining / (2 * workers))
+                    chunk, chunk_bytes = [], 0
+                    while small and (not chunk or chunk_bytes + small[0][3] <= target):
+                        name, item, language, size = small.popleft()
+                        chunk.append((name, item, language))
+                        chunk_bytes += size
+                    remaining -= chunk_bytes
+                    chunks[executor.submit(_run_chunk, task, chunk)] = chunk_bytes
+
+                done, _ = wait(chunks, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk_results = future.result()
+                    results.update((name, _unshare_result(result)) for name, result in chunk_results)
+                    measured_bytes += chunks.pop(future)
+                    measured_seconds += sum(result['processing_time'] for _, result in chunk_results)
+                self.seconds_per_byte = measured_seconds / max(measured_bytes, 1)
+
+            for future in futures:
+                results.update((name, _unshare_result(result)) for name, result in future.result())
+        return results
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Eviction trims the cache to this fraction of max_bytes so it does not run on every write
+EVICTION_LOW_WATERMARK = 0.9
+# Temp files older than this were left behind by a writer that died mid-write
+STALE_TEMP_SECONDS = 3600
+
+def rules_fingerprint(rules):
+    """Stable hash of an effective rules dict"""
+    encoded = json.dumps(rules, sort_keys=True, default=repr).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+class ResultCache:
+    """Content-addressed, size-bounded on-disk cache of format results
+
+    Entries are JSON files at <directory>/<key[:2]>/<key>. Every write goes
+    to a temp file in the same directory and is moved into place with
+    os.replace, so several processes can share one cache directory and
+    readers only ever see complete entries. A hit refreshes the entry's
+    mtime; evict() removes the least recently used entries once the cache
+    is over max_bytes.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, content, *settings):
+        """Key for content formatted under settings (language, style, rules fingerprint, version...)"""
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return hashlib.sha256('\0'.join([content_hash] + [str(s) for s in settings]).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Cached entry for key, or None"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.loads(f.read())
+        except (OSError, ValueError):
+            # Missing, evicted meanwhile, or unreadable: all plain misses
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # a read-only cache still serves hits; it just cannot track recency
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        """Store a JSON-serializable entry under key"""
+        data = json.dumps(entry, separators=(',', ':')).encode('utf-8')
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        except OSError:
+            return  # read-only cache
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            return
+
+        self._written += len(data)
+        if self._written > self.max_bytes * (1 - EVICTION_LOW_WATERMARK):
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        self._written = 0
+        entries = []
+        total = 0
+        now = time.time()
+        for shard in _scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in _scandir(shard.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if entry.name.startswith('.tmp-'):
+                    if now - stat.st_mtime > STALE_TEMP_SECONDS:
+                        _unlink(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        target = self.max_bytes * EVICTION_LOW_WATERMARK
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            # Another process may have evicted it already; it is gone either way
+            _unlink(path)
+            total -= size
+            removed += 1
+        return removed
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+def _scandir(path):
+    try:
+        return list(os.scandir(path))
+    except OSError:
+        return []
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
@@ -0,0 +1,134 @@
+import json
+import os
+import socket
+import socketserver
+
+from . import get_logger, registry
+from .edits import apply_edits
+from .ranges import parse_line_range
+
+logger = get_logger(__name__)
+
+OPS = ['format', 'check', 'edits', 'ping']
+
+class FormatterDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Long-lived formatting server speaking JSON lines over a Unix socket
+
+    Each request line is an object with an 'op' (format, check, edits or
+    ping), the 'source' text and either a 'language' or a 'path' to detect
+    it from; 'converge', 'max_iterations' and 'lines' (1-based, inclusive
+    [first, last] ranges to format instead of the whole source) are
+    optional and an 'id' is echoed back. Each response line has 'ok' and
+    either the op's fields or an 'error':
+
+        format  formatted_code, changed, issues, fixes_applied
+        check   changed
+        edits   edits as [start, end, replacement] lists
+
+    Formatters come from the process-wide registry and stay warm across
+    requests; every connection is served on its own thread.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, style='google', engine='patch'):
+        self.socket_path = socket_path
+        self.style = style
+        self.engine = engine
+        _remove_stale_socket(socket_path)
+        # Owner-only socket: the daemon reads whatever source it is sent
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        for language in registry.get_language_manager().get_supported_languages():
+            registry.get_formatter(language, style, engine)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+
+    def handle_request_object(self, request):
+        """Answer one decoded request"""
+        op = request.get('op')
+        if op not in OPS:
+            raise ValueError(f"Unknown op {op!r}, expected one of {OPS}")
+        if op == 'ping':
+            return {}
+
+        source = request['source']
+        language_manager = registry.get_language_manager()
+        language = request.get('language') or language_manager.detect_language(request.get('path', ''))
+        # Anything else would be formatted as Java, and cache a formatter of its own
+        languages = language_manager.get_supported_languages()
+        if language not in languages:
+            raise ValueError(f"Unknown language {language!r}, expected one of {languages}")
+        formatter = registry.get_formatter(language, self.style, self.engine)
+        converge = bool(request.get('converge', False))
+        max_iterations = request.get('max_iterations', 10)
+
+        lines = [parse_line_range(f"{first}-{last}") for first, last in request.get('lines') or []]
+
+        if op == 'format':
+            if lines:
+                result = formatter.format_source_lines(source, lines, converge, max_iterations)
+                formatted_code = apply_edits(source, result['edits'])
+            else:
+                result = formatter.format_source(source, converge, max_iterations)
+                formatted_code = result['formatted_code']
+            _raise_error(result)
+            return {
+                'formatted_code': formatted_code,
+                'changed': formatted_code != source,
+                'issues': len(result['issues_found']),
+                'fixes_applied': result['fixes_applied'],
+            }
+
+        if lines:
+            result = formatter.format_source_lines(source, lines, converge, max_iterations)
+        else:
+            result = formatter.format_source_edits(source, converge, max_iterations)
+        _raise_error(result)
+        if op == 'check':
+            return {'changed': bool(result['edits'])}
+        return {'edits': result['edits']}
+
+def _raise_error(result):
+    """Answer a request whose source could not be formatted with an error, not as unchanged"""
+    if 'error' in result:
+        raise ValueError(f"Formatting failed: {result['error']}")
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            response = {}
+            try:
+                request = json.loads(line)
+                response['id'] = request.get('id')
+                response.update(self.server.handle_request_object(request))
+                response['ok'] = True
+            except Exception as e:
+                logger.warning("Bad daemon request: %s", e)
+                response.update(ok=False, error=str(e))
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+def _remove_stale_socket(socket_path):
+    """Remove a socket file left by a daemon that is gone; refuse to steal a live one"""
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+    else:
+        raise OSError(f"A formatter daemon is already listening on {socket_path}")
+    finally:
+        probe.close()
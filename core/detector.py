@@ -1,11 +1,14 @@
 import re
+from core import get_logger
 from core.language_manager import LanguageManager
 
+logger = get_logger(__name__)
+
 class CodeIssueDetector:
-    def __init__(self, language='java', style='google'):
+    def __init__(self, language='java', style='google', language_manager=None):
         self.language = language
         self.style = style
-        self.language_manager = LanguageManager()
+        self.language_manager = language_manager or LanguageManager()
         self.rules = self.language_manager.get_rules(language)
     
     def detect_issues(self, tokens, original_code):
@@ -33,7 +36,7 @@ class CodeIssueDetector:
             issues.extend(self._check_blank_lines(original_code))
             issues = self._remove_duplicate_issues(issues)
         except Exception as e:
-            print(f"❌ Error in issue detection: {e}")
+            logger.error("❌ Error in issue detection: %s", e)
         
         return issues
 
@@ -0,0 +1,288 @@
+import bisect
+import re
+
+
+def common_prefix_length(a, b):
+    """Length of the common prefix of two strings, compared block-wise"""
+    limit = min(len(a), len(b))
+    step = 4096
+    i = 0
+    while i < limit and a[i:i + step] == b[i:i + step]:
+        i += step
+    i = min(i, limit)
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def common_suffix_length(a, b, limit=None):
+    """Length of the common suffix of two strings, never reaching into the first `limit` chars"""
+    limit = min(len(a), len(b)) if limit is None else limit
+    step = 4096
+    n = 0
+    while n < limit and a[len(a) - min(n + step, limit):len(a) - n] == b[len(b) - min(n + step, limit):len(b) - n]:
+        n = min(n + step, limit)
+    while n < limit and a[len(a) - n - 1] == b[len(b) - n - 1]:
+        n += 1
+    return n
+
+
+def changed_region(before, after):
+    """Return the (start, end) slice of `after` that differs from `before`, widened to whole lines"""
+    prefix = common_prefix_length(before, after)
+    if prefix == len(before) == len(after):
+        return None
+    suffix = common_suffix_length(before, after, min(len(before), len(after)) - prefix)
+
+    start = after.rfind('\n', 0, prefix) + 1
+    end = after.find('\n', len(after) - suffix)
+    return start, len(after) if end == -1 else end
+
+
+def apply_edits(text, edits):
+    """Apply sorted, non-overlapping (start, end, replacement) edits to text"""
+    chunks = []
+    position = 0
+    for start, end, replacement in edits:
+        chunks.append(text[position:start])
+        chunks.append(replacement)
+        position = end
+    chunks.append(text[position:])
+    return ''.join(chunks)
+
+
+def split_lines(text):
+    """Lines of text, each keeping its '\\n'; unlike str.splitlines, no other character ends a line"""
+    lines = [line + '\n' for line in text.split('\n')]
+    lines[-1] = lines[-1][:-1]
+    return lines if lines[-1] else lines[:-1]
+
+
+def unified_diff_from_edits(original, edits, fromfile='', tofile='', context=3):
+    """Unified diff lines for sorted (start, end, replacement) edits of original
+
+    Only the lines the edits touch are compared, so the cost follows the
+    size of the change rather than the size of the file.
+    """
+    if not edits:
+        return []
+
+    lines = split_lines(original)
+    line_starts = [0]
+    for line in lines:
+        line_starts.append(line_starts[-1] + len(line))
+
+    # The end of a final line without a newline still belongs to that line
+    last_line = len(lines) if not original or original.endswith('\n') else len(lines) - 1
+
+    # Group edits sharing a line into [first line, last line, edits] blocks
+    blocks = []
+    for start, end, replacement in edits:
+        first = min(bisect.bisect_right(line_starts, start) - 1, last_line)
+        last = min(bisect.bisect_right(line_starts, end) - 1, last_line)
+        if blocks and first <= blocks[-1][1]:
+            blocks[-1][1] = max(blocks[-1][1], last)
+            blocks[-1][2].append((start, end, replacement))
+        else:
+            blocks.append([first, last, [(start, end, replacement)]])
+
+    changes = []
+    for first, last, block_edits in blocks:
+        stop = min(last + 1, len(lines))
+        region_start = line_starts[first]
+        region_end = line_starts[stop]
+        shifted = [(start - region_start, end - region_start, replacement)
+                   for start, end, replacement in block_edits]
+        new_text = apply_edits(original[region_start:region_end], shifted)
+        if changes and changes[-1][1] == first:
+            # Changes on adjacent lines are one change, written as difflib does: all '-' then all '+'
+            changes[-1] = (changes[-1][0], stop, changes[-1][2] + new_text)
+        else:
+            changes.append((first, stop, new_text))
+    changes = [(first, stop, split_lines(new_text)) for first, stop, new_text in changes]
+
+    diff = [f'--- {fromfile}\n', f'+++ {tofile}\n']
+    offset = 0
+    index = 0
+    while index < len(changes):
+        # Pull in every following change whose context would overlap
+        group_end = index + 1
+        while group_end < len(changes) and changes[group_end][0] - changes[group_end - 1][1] <= 2 * context:
+            group_end += 1
+        group = changes[index:group_end]
+
+        old_start = max(0, group[0][0] - context)
+        old_stop = min(len(lines), group[-1][1] + context)
+        body = []
+        position = old_start
+        new_length = 0
+        for first, stop, new_lines in group:
+            body.extend(' ' + line for line in lines[position:first])
+            body.extend('-' + line for line in lines[first:stop])
+            body.extend('+' + line for line in new_lines)
+            new_length += (first - position) + len(new_lines)
+            position = stop
+        body.extend(' ' + line for line in lines[position:old_stop])
+        new_length += old_stop - position
+        old_length = old_stop - old_start
+
+        diff.append(f'@@ -{_hunk_range(old_start, old_length)} '
+                    f'+{_hunk_range(old_start + offset, new_length)} @@\n')
+        for line in body:
+            diff.append(line if line.endswith('\n') else line + '\n\\ No newline at end of file\n')
+        offset += new_length - old_length
+        index = group_end
+
+    return diff
+
+
+def _hunk_range(start, length):
+    """Hunk header range: 1-based start, omitted length when 1, as difflib writes it"""
+    if length == 1:
+        return str(start + 1)
+    if not length:
+        return f'{start},0'
+    return f'{start + 1},{length}'
+
+
+class EditTracker:
+    """Text that records every rewrite as spans of the original.
+
+    The pieces list describes the current text as a sequence of original
+    slices (start, end) and inserted strings, so edits applied over many
+    passes compose back into one (start, end, replacement) list against
+    the original text.
+    """
+
+    def __init__(self, text):
+        self.original = text
+        self.text = text
+        self._pieces = [(0, len(text))] if text else []
+
+    def splice(self, edits):
+        """Apply sorted, non-overlapping edits given in current-text offsets"""
+        edits = list(edits)
+        if not edits:
+            return self
+
+        pieces = []
+        remaining = iter(self._pieces)
+        piece = next(remaining, None)
+        position = 0  # offset of `piece` in the current text
+
+        for start, end, replacement in edits:
+            # Keep everything before the edit
+            while piece is not None and position + _piece_length(piece) <= start:
+                _append_piece(pieces, piece)
+                position += _piece_length(piece)
+                piece = next(remaining, None)
+            if piece is not None and position < start:
+                _append_piece(pieces, _cut_piece(piece, 0, start - position))
+                piece = _cut_piece(piece, start - position, _piece_length(piece))
+                position = start
+
+            # Drop the replaced range
+            while piece is not None and position + _piece_length(piece) <= end:
+                position += _piece_length(piece)
+                piece = next(remaining, None)
+            if piece is not None and position < end:
+                piece = _cut_piece(piece, end - position, _piece_length(piece))
+                position = end
+
+            if replacement:
+                _append_piece(pieces, replacement)
+
+        while piece is not None:
+            _append_piece(pieces, piece)
+            piece = next(remaining, None)
+
+        self._pieces = pieces
+        self.text = apply_edits(self.text, edits)
+        return self
+
+    def sub(self, pattern, repl, flags=0):
+        """Tracked equivalent of re.sub(pattern, repl, text)"""
+        regex = re.compile(pattern, flags) if isinstance(pattern, str) else pattern
+        edits = []
+        for match in regex.finditer(self.text):
+            replacement = match.expand(repl) if isinstance(repl, str) else repl(match)
+            if replacement != match.group():
+                edits.append((match.start(), match.end(), replacement))
+        return self.splice(edits)
+
+    def replace(self, old, new, count=-1):
+        """Tracked equivalent of str.replace"""
+        edits = []
+        position = self.text.find(old)
+        while position != -1 and count != 0:
+            edits.append((position, position + len(old), new))
+            position = self.text.find(old, position + len(old))
+            count -= 1
+        return self.splice(edits)
+
+    def strip(self):
+        """Tracked equivalent of str.strip"""
+        stripped = self.text.strip()
+        if not stripped:
+            return self.splice([(0, len(self.text), '')])
+        start = self.text.find(stripped)
+        return self.splice([(0, start, ''), (start + len(stripped), len(self.text), '')])
+
+    def replace_text(self, new_text):
+        """Record an arbitrary rewrite as the single region that changed"""
+        prefix = common_prefix_length(self.text, new_text)
+        suffix = common_suffix_length(self.text, new_text, min(len(self.text), len(new_text)) - prefix)
+        if prefix == len(self.text) == len(new_text):
+            return self
+        return self.splice([(prefix, len(self.text) - suffix, new_text[prefix:len(new_text) - suffix])])
+
+    def edits(self):
+        """Minimal (start, end, replacement) edits turning the original into the current text"""
+        edits = []
+        position = 0
+        pending = []
+        for piece in self._pieces:
+            if isinstance(piece, str):
+                pending.append(piece)
+                continue
+            if piece[0] != position or pending:
+                edits.append((position, piece[0], ''.join(pending)))
+                pending = []
+            position = piece[1]
+        if position != len(self.original) or pending:
+            edits.append((position, len(self.original), ''.join(pending)))
+
+        minimal = []
+        for start, end, replacement in edits:
+            old = self.original[start:end]
+            prefix = common_prefix_length(old, replacement)
+            suffix = common_suffix_length(old, replacement, min(len(old), len(replacement)) - prefix)
+            if prefix == len(old) == len(replacement):
+                continue
+            minimal.append((start + prefix, end - suffix, replacement[prefix:len(replacement) - suffix]))
+        return minimal
+
+
+def _piece_length(piece):
+    return len(piece) if isinstance(piece, str) else piece[1] - piece[0]
+
+
+def _cut_piece(piece, start, end):
+    if isinstance(piece, str):
+        return piece[start:end]
+    return (piece[0] + start, piece[0] + end)
+
+
+def _append_piece(pieces, piece):
+    """Append a piece, merging it with a contiguous neighbour of the same kind"""
+    if not _piece_length(piece):
+        return
+    if pieces:
+        last = pieces[-1]
+        if isinstance(piece, str) and isinstance(last, str):
+            pieces[-1] = last + piece
+            return
+        if not isinstance(piece, str) and not isinstance(last, str) and last[1] == piece[0]:
+            pieces[-1] = (last[0], piece[1])
+            return
+    pieces.append(piece)
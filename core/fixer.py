@@ -1,15 +1,37 @@
 import re
+import time
+from core import get_logger
+from core.edits import EditTracker, apply_edits
+
+logger = get_logger(__name__)
 
 class CodeFixer:
     def __init__(self, tokenizer):
         self.tokenizer = tokenizer
-        self.applied_fixes = []
-        self.language = 'java'
-    def apply_fixes(self, original_code, issues, language='java'):
-        self.language = language
-        """Apply fixes in optimal order to avoid conflicts"""
+    
+    def apply_fixes(self, original_code, issues, language='java', metrics=None):
+        """Apply fixes in optimal order to avoid conflicts
+        
+        Returns (formatted_code, applied_fixes). The fixer keeps no per-call
+        state, so one instance can serve several threads at once. When a
+        metrics dict is given, the time spent fixing and in the final
+        cleanup is added to its fix_ns and cleanup_ns entries.
+        """
         if not issues:
-            return original_code
+            return original_code, []
+        return self._apply_fixes(original_code, issues, language, metrics)
+    
+    def apply_fixes_tracked(self, tracker, issues, language='java', metrics=None):
+        """Apply fixes to an EditTracker so the changes are available as edit spans
+        
+        Returns (tracker, applied_fixes).
+        """
+        if not issues:
+            return tracker, []
+        return self._apply_fixes(tracker, issues, language, metrics)
+    
+    def _apply_fixes(self, original_code, issues, language, metrics=None):
+        start_ns = time.perf_counter_ns()
        # Prevent Python ':' from being "fixed" as an operator
         unique_issues = self._remove_duplicate_issues(issues) # <-- Define unique_issues here
 
@@ -41,7 +63,7 @@ class CodeFixer:
             # Note: The second call to self._remove_duplicate_issues(issues) later must be REMOVED.
 
         formatted_code = original_code
-        self.applied_fixes = []
+        applied_fixes = []
        
        
         # Group by type and apply in specific order
@@ -68,18 +90,19 @@ class CodeFixer:
             # 'python_block_indent',
         ]
        
-        # Apply in order
+        # Apply in order, one batched pass per fix type
         for fix_type in apply_order:
             if fix_type in fixes_by_type:
-                for issue in fixes_by_type[fix_type]:
-                    fix_result = self._apply_single_fix_smart(formatted_code, issue)
-                    if fix_result['success']:
-                        formatted_code = fix_result['code']
-                        self.applied_fixes.append(issue)
+                formatted_code, applied = self._apply_fix_batch(formatted_code, fix_type, fixes_by_type[fix_type], language)
+                applied_fixes.extend(applied)
        
+        fixed_ns = time.perf_counter_ns()
         # FINAL CLEANUP WITH LANGUAGE SUPPORT
         formatted_code = self._post_cleanup_pass(formatted_code, language)
-        return formatted_code
+        if metrics is not None:
+            metrics['fix_ns'] = metrics.get('fix_ns', 0) + fixed_ns - start_ns
+            metrics['cleanup_ns'] = metrics.get('cleanup_ns', 0) + time.perf_counter_ns() - fixed_ns
+        return formatted_code, applied_fixes
     
     def _post_cleanup_pass(self, code, language='java'):
         """Final cleanup pass with language-specific handling"""
@@ -94,7 +117,7 @@ class CodeFixer:
 
         # CRITICAL FIX A: AGGRESSIVELY TIGHTEN ALL COLONS IMMEDIATELY.
         # This removes spaces added in the main fix loop (e.g., ' : ')
-        code = re.sub(r'\s*:\s*', ':', code) 
+        code = _sub(r'\s*:\s*', ':', code) 
 
         # Step 1: Basic Python formatting (Fixes commas, operators, parentheses)
         # Note: We can now remove the redundant colon tightening from _basic_python_formatting
@@ -118,14 +141,14 @@ class CodeFixer:
             # Add space around operator, protecting against the operator being at the start/end of the line
             pattern = r'(\S)' + op + r'(\S)'
             replacement = r'\1 ' + op.replace('\\', '') + r' \2'
-            code = re.sub(pattern, replacement, code)
+            code = _sub(pattern, replacement, code)
         
         # 2. Fix commas: (a,b) -> (a, b)
-        code = re.sub(r',(\S)', r', \1', code)
+        code = _sub(r',(\S)', r', \1', code)
         
         # 3. Fix parentheses: Remove spaces *after* opening and *before* closing (essential for Python calls)
-        code = re.sub(r'\(\s*', '(', code)
-        code = re.sub(r'\s*\)', ')', code)
+        code = _sub(r'\(\s*', '(', code)
+        code = _sub(r'\s*\)', ')', code)
         
       
         return code
@@ -138,28 +161,28 @@ class CodeFixer:
         # --- CRITICAL FIX: AGGRESSIVELY ENSURE COLON IS FOLLOWED BY A NEWLINE ---
         # 1. Tighten all colons, whether spaced or not.
         # This fixes the ' : ' issue from the main fix loop.
-        code = re.sub(r'\s*:\s*', ':', code)
+        code = _sub(r'\s*:\s*', ':', code)
         
         # 2. Force newline insertion loop. This must run multiple times 
         # to catch nested single-line blocks (e.g., 'if x:if y:pass').
         while True:
+            previous_code = _text(code)
             # Matches a colon NOT followed by a newline, OR a colon immediately
             # followed by non-whitespace characters (like 'class Test:def').
             # We explicitly replace the colon followed by a character (group 1)
-            new_code = re.sub(r':(\S)', r':\n\1', code)
+            code = _sub(r':(\S)', r':\n\1', code)
             
             # Also handle single-line body following a newline (e.g., in Test 18's 'pass')
-            new_code = re.sub(r'\n(\s*)(pass|break|continue|return)\b', r'\n\1\4', new_code)
+            code = _sub(r'\n(\s*)(pass|break|continue|return)\b', r'\n\1\4', code)
             
-            if new_code == code:
+            if _text(code) == previous_code:
                 break
-            code = new_code
         # ----------------------------------------------------------------------
         
         output_lines = []
         indentation_level = 0
         
-        for line in code.split('\n'):
+        for line in _text(code).split('\n'):
             stripped_line = line.strip()
             if not stripped_line:
                 output_lines.append('')
@@ -191,8 +214,8 @@ class CodeFixer:
             indentation_level = max(0, indentation_level + next_indent_change)
         
         # 2. Final Cleanup
-        code = '\n'.join(output_lines)
-        code = re.sub(r'\n{3,}', '\n\n', code) # Remove excessive blank lines
+        code = _replace_lines(code, output_lines)
+        code = _sub(r'\n{3,}', '\n\n', code) # Remove excessive blank lines
         
         return code
     def _is_python_block_starter(self, line):
@@ -223,15 +246,15 @@ class CodeFixer:
         # 1. Fix dictionary/type hint colons (space after, no space before)
         # Targets 'key:value' -> 'key: value'. We use \S+ to match the key/value.
         # This addresses Test 15: "my_dict = {'a' : 1, 'b' : 2}" -> "my_dict = {'a': 1, 'b': 2}"
-        code = re.sub(r"(\S+):(\S+)", r"\1: \2", code)
+        code = _sub(r"(\S+):(\S+)", r"\1: \2", code)
 
         # 2. Fix slice colons (no spaces, e.g. [1:5:2])
         # This is very context-dependent. Let's rely on the previous pass's tight packing for now.
         
         # 3. Clean up multiple spaces
-        code = re.sub(r'  +', ' ', code)
+        code = _sub(r'  +', ' ', code)
         
-        return code.strip()
+        return _strip(code)
     
     def _java_cleanup_pass(self, code):
         """Java-specific cleanup (your existing logic)"""
@@ -255,17 +278,17 @@ class CodeFixer:
             "%=": "__RA__"
         }
         for op, tag in protect_map.items():
-            code = code.replace(op, tag)
+            code = _replace(code, op, tag)
         # -------------------------------------------------------
         # 1. Fix spacing for SINGLE operators
         # -------------------------------------------------------
-        code = re.sub(r"(?<![=!<>])\s*=\s*(?![=])", " = ", code)
-        code = re.sub(r"(?<![\+])\s*\+\s*(?![\+=])", " + ", code)
-        code = re.sub(r"(?<![\-])\s*\-\s*(?![\-=])", " - ", code)
-        code = re.sub(r"(?<![\*])\s*\*\s*(?![\*=])", " * ", code)
-        code = re.sub(r"(?<![/])\s*/\s*(?![/=])", " / ", code)
-        code = re.sub(r"(?<![<])\s*<\s*(?![<>=])", " < ", code)
-        code = re.sub(r"(?<![>])\s*>\s*(?![<>=])", " > ", code)
+        code = _sub(r"(?<![=!<>])\s*=\s*(?![=])", " = ", code)
+        code = _sub(r"(?<![\+])\s*\+\s*(?![\+=])", " + ", code)
+        code = _sub(r"(?<![\-])\s*\-\s*(?![\-=])", " - ", code)
+        code = _sub(r"(?<![\*])\s*\*\s*(?![\*=])", " * ", code)
+        code = _sub(r"(?<![/])\s*/\s*(?![/=])", " / ", code)
+        code = _sub(r"(?<![<])\s*<\s*(?![<>=])", " < ", code)
+        code = _sub(r"(?<![>])\s*>\s*(?![<>=])", " > ", code)
         # -------------------------------------------------------
         # 2. Restore protected multi-char operators WITH spacing
         # -------------------------------------------------------
@@ -285,85 +308,156 @@ class CodeFixer:
             "__RA__": " %= "
         }
         for tag, op in restore_map.items():
-            code = code.replace(tag, op)
+            code = _replace(code, tag, op)
         # -------------------------------------------------------
         # 🎯 PATCH 1 (REFINED): CRITICAL OPERATOR CLEANUP
         # Fixes operators split by the single operator spacing rules
-        code = re.sub(r"=\s*=", " == ", code) 
-        code = re.sub(r"\+\s*=", " += ", code) 
-        code = re.sub(r"!\s*=", " != ", code) 
-        code = re.sub(r"&\s*&", " && ", code)
-        code = re.sub(r"\|\s*\|", " || ", code)
+        code = _sub(r"=\s*=", " == ", code) 
+        code = _sub(r"\+\s*=", " += ", code) 
+        code = _sub(r"!\s*=", " != ", code) 
+        code = _sub(r"&\s*&", " && ", code)
+        code = _sub(r"\|\s*\|", " || ", code)
         # -------------------------------------------------------
         # 3. Fix colon spacing (ternary + switch + enhanced for)
         # -------------------------------------------------------
         # Switch case specific — normalize spacing
-        code = re.sub(r"case\s*(\w+)\s*:\s*", r"case \1:", code)
+        code = _sub(r"case\s*(\w+)\s*:\s*", r"case \1:", code)
         # Enhanced for-loop: "s: strings" → "s : strings"
-        code = re.sub(r"for\s*\((.*?)\s*:\s*(.*?)\)", r"for (\1 : \2)", code)
+        code = _sub(r"for\s*\((.*?)\s*:\s*(.*?)\)", r"for (\1 : \2)", code)
         # Ternary specific
-        code = re.sub(r"\?\s*(\w+)\s*:\s*(\w+)", r"? \1 : \2", code)
+        code = _sub(r"\?\s*(\w+)\s*:\s*(\w+)", r"? \1 : \2", code)
         # -------------------------------------------------------
         # 🎯 PATCH 2: SWITCH STATEMENT CLEANUP
         # Ensures space before 'break' inside a case
-        code = code.replace(":break;", ": break;")
+        code = _replace(code, ":break;", ": break;")
         # -------------------------------------------------------
         # 4. Braces spacing fixes
         # -------------------------------------------------------
         # "{x" → "{ x"
-        code = re.sub(r"\{(?=\w)", "{ ", code)
+        code = _sub(r"\{(?=\w)", "{ ", code)
         # "x{" → "x {"
-        code = re.sub(r"(\w)\{", r"\1 {", code)
+        code = _sub(r"(\w)\{", r"\1 {", code)
         # "x}" → "x }"
-        code = re.sub(r"(\w)\}", r"\1 }", code)
+        code = _sub(r"(\w)\}", r"\1 }", code)
         # ";}" → "; }"
-        code = code.replace(";}", "; }")
+        code = _replace(code, ";}", "; }")
         # "}else" → "} else"
-        code = re.sub(r"}\s*else", "} else", code)
-        code = re.sub(r"}\s*if", "} if", code)
-        code = re.sub(r"}\s*catch", "} catch", code)
-        code = re.sub(r"}\s*finally", "} finally", code)
+        code = _sub(r"}\s*else", "} else", code)
+        code = _sub(r"}\s*if", "} if", code)
+        code = _sub(r"}\s*catch", "} catch", code)
+        code = _sub(r"}\s*finally", "} finally", code)
         # -------------------------------------------------------
         # 5. Java do-while fix
-        code = re.sub(r"\}\s*while", "} while", code)
+        code = _sub(r"\}\s*while", "} while", code)
         # -------------------------------------------------------
         # 6. Fix bitwise OR spacing in expressions
-        code = re.sub(r"(\w)\|(\w)", r"\1 | \2", code)
+        code = _sub(r"(\w)\|(\w)", r"\1 | \2", code)
         # -------------------------------------------------------
         # 7. Clean up doubled spaces
-        code = re.sub(r"\s{2,}", " ", code)
+        code = _sub(r"\s{2,}", " ", code)
         # -------------------------------------------------------
         # PATCH 3: KEYWORD SPACING FIX
         keywords = ['if', 'else', 'while', 'for', 'switch', 'do', 'try', 'catch', 'finally']
         for kw in keywords:
-            code = re.sub(rf"{re.escape(kw)}\s*\(\s*", rf"{kw} (", code) 
-            code = re.sub(rf"{re.escape(kw)}\s*{{\s*", rf"{kw} {{", code) 
+            code = _sub(rf"{re.escape(kw)}\s*\(\s*", rf"{kw} (", code) 
+            code = _sub(rf"{re.escape(kw)}\s*{{\s*", rf"{kw} {{", code) 
         # -------------------------------------------------------
         # Array init spaces
-        code = re.sub(r"{\s+(?=[-\d\"'])", "{", code)
-        code = re.sub(r"([-\d\"'])\s+}", r"\1}", code)
+        code = _sub(r"{\s+(?=[-\d\"'])", "{", code)
+        code = _sub(r"([-\d\"'])\s+}", r"\1}", code)
         # -------------------------------------------------------
         # Method param closing ) {
-        code = re.sub(r"\)\s*\{", r") {", code)
+        code = _sub(r"\)\s*\{", r") {", code)
         # -------------------------------------------------------
         # Add spaces after } before next word or }
-        code = re.sub(r"}\s*(\w)", r"} \1", code)
-        code = re.sub(r"}\s*}", "} }", code)
+        code = _sub(r"}\s*(\w)", r"} \1", code)
+        code = _sub(r"}\s*}", "} }", code)
         # -------------------------------------------------------
         # Add space after semicolon if not followed by space, newline, or }
-        code = re.sub(r";(?![ \n}])", "; ", code)
+        code = _sub(r";(?![ \n}])", "; ", code)
         # -------------------------------------------------------
         # Clean up doubled spaces again
-        code = re.sub(r"\s{2,}", " ", code)
+        code = _sub(r"\s{2,}", " ", code)
         return code
        
-    def _apply_operator_fix(self, code, issue):
+    def _apply_fix_batch(self, code, fix_type, issues, language='java'):
+        """Apply every issue of one fix type in a single compiled splice pass"""
+        # Array declarations rewrite token order, keep their dedicated handler
+        if fix_type == 'java_array_declaration':
+            return self._apply_fixes_sequentially(code, issues, language)
+        
+        replacements = {}
+        pattern_issues = {}
+        for issue in issues:
+            old_pattern = issue.get('old_pattern', '')
+            new_pattern = issue.get('new_pattern', '')
+            if not old_pattern or not new_pattern:
+                continue
+            if language == 'python' and old_pattern == ':':
+                continue
+            replacements.setdefault(old_pattern, (new_pattern, issue))
+            pattern_issues.setdefault(old_pattern, []).append(issue)
+        
+        if 'operator' in fix_type:
+            code = self._repair_broken_compound_operators(code, replacements)
+        
+        if not replacements:
+            return code, []
+        
+        # One lookahead over a prefix-factored alternation finds every occurrence,
+        # including overlapping ones such as "A,B" and "B,C" in "A,B,C"
+        pattern = re.compile('(?=(' + _build_trie_pattern(replacements) + '))')
+        edits = []
+        matched = set()  # found in the code, though possibly overlapped by another edit
+        for match in pattern.finditer(_text(code)):
+            old_pattern = match.group(1)
+            new_pattern = replacements[old_pattern][0]
+            prefix, suffix = _common_affixes(old_pattern, new_pattern)
+            start = match.start() + prefix
+            edits.append((start, match.start() + len(old_pattern) - suffix,
+                          new_pattern[prefix:len(new_pattern) - suffix], old_pattern))
+            matched.add(old_pattern)
+        
+        code, spliced = _splice(code, edits)
+        # One applied entry per occurrence rewritten, so counts per fix type stay accurate
+        applied = []
+        for old_pattern, count in spliced.items():
+            found = pattern_issues[old_pattern]
+            applied.extend(found[:count])
+            applied.extend([found[0]] * (count - len(found)))
+        
+        # Patterns that vanished (e.g. rewritten by an earlier fix type) still get
+        # the alternative-pattern matching of the single-fix path
+        leftovers = [issue for old_pattern, (_, issue) in replacements.items() if old_pattern not in matched]
+        code, recovered = self._apply_fixes_sequentially(code, leftovers, language)
+        return code, applied + recovered
+    
+    def _apply_fixes_sequentially(self, code, issues, language='java'):
+        """Apply issues one at a time through the pattern-specific handlers"""
+        applied = []
+        for issue in issues:
+            fix_result = self._apply_single_fix_smart(_text(code), issue, language)
+            if fix_result['success']:
+                code = _set_text(code, fix_result['code'])
+                applied.append(issue)
+        return code, applied
+    
+    def _repair_broken_compound_operators(self, code, replacements):
+        """Rejoin compound operators split by earlier passes (e.g. "x + = 5")"""
+        compound_ops = ['+=', '-=', '*=', '/=', '%=', '==', '!=', '&&', '||']
+        for op in compound_ops:
+            broken = f"{op[0]} {op[1]}"
+            if broken in _text(code) and any(op in old and op in new for old, (new, _) in replacements.items()):
+                code = _replace(code, broken, op)
+        return code
+    
+    def _apply_operator_fix(self, code, issue, language='java'):
         """Apply operator spacing fixes with proper compound operator support"""
         old_pattern = issue.get('old_pattern', '')
         new_pattern = issue.get('new_pattern', '')
        
         # --- CRITICAL PYTHON COLON FIX ---
-        if self.language == 'python' and old_pattern == ':' and new_pattern == ' : ':
+        if language == 'python' and old_pattern == ':' and new_pattern == ' : ':
             return {'success': False, 'code': code, 'reason': 'Python block colon fix deferred.'}
         # ---------------------------------
         
@@ -411,16 +505,16 @@ class CodeFixer:
             seen_patterns.add(pattern_key)
             unique_issues.append(issue)
        
-        print(f"🔍 Removed {len(issues) - len(unique_issues)} duplicate issues")
+        logger.debug("🔍 Removed %d duplicate issues", len(issues) - len(unique_issues))
         return unique_issues
     
-    def _apply_single_fix_smart(self, code, issue):
+    def _apply_single_fix_smart(self, code, issue, language='java'):
         """Apply a single fix with intelligent pattern matching"""
         try:
             old_pattern = issue.get('old_pattern', '')
             new_pattern = issue.get('new_pattern', '')
            # Python-specific: block colon must NOT be replaced early
-            if issue.get("old_pattern") == ":" and self.language == "python":
+            if issue.get("old_pattern") == ":" and language == "python":
                 # This is an extra check, but _apply_operator_fix has the hard guard now
                 return {'success': False, 'code': code, 'reason': 'colon deferred to cleanup'}
             if not old_pattern or not new_pattern:
@@ -438,7 +532,7 @@ class CodeFixer:
             elif 'brace' in fix_type:
                 return self._apply_brace_fix(code, issue)
             elif 'operator' in fix_type:
-                return self._apply_operator_fix(code, issue)
+                return self._apply_operator_fix(code, issue, language)
             elif 'keyword' in fix_type:
                 return self._apply_keyword_fix(code, issue)
             elif 'semicolon' in fix_type:
@@ -449,7 +543,7 @@ class CodeFixer:
                 return self._apply_generic_fix(code, issue)
                
         except Exception as e:
-            print(f"Error applying fix: {e}")
+            logger.warning("Error applying fix: %s", e)
             return {'success': False, 'code': code, 'reason': str(e)}
    
     def _is_fix_already_applied(self, code, old_pattern, new_pattern):
@@ -654,6 +748,98 @@ class CodeFixer:
         # For most cases, the new pattern remains the same
         return new_pattern
 
+def _build_trie_pattern(words):
+    """Build a regex alternation of literal words, factored by common prefix"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = None
+    
+    def build(node):
+        # Walk unbranched runs iteratively so long literals don't recurse per character
+        literal = []
+        while len(node) == 1 and '' not in node:
+            char, node = next(iter(node.items()))
+            literal.append(re.escape(char))
+        
+        branches = [re.escape(char) + build(child) for char, child in node.items() if char != '']
+        if not branches:
+            return ''.join(literal)
+        body = '(?:' + '|'.join(branches) + ')'
+        # Greedy optional keeps the longest word when one is a prefix of another
+        return ''.join(literal) + (body + '?' if '' in node else body)
+    
+    return build(trie)
+
+def _common_affixes(old, new):
+    """Length of the shared prefix and suffix between two patterns"""
+    limit = min(len(old), len(new))
+    prefix = 0
+    while prefix < limit and old[prefix] == new[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+def _splice(code, edits):
+    """Apply (start, end, replacement, tag) edits in one pass, returning {tag: edits kept}"""
+    if not edits:
+        return code, {}
+    
+    edits.sort(key=lambda edit: (edit[0], edit[1]))
+    spliced = []
+    kept = {}
+    position = 0
+    last_insert = None
+    for start, end, replacement, tag in edits:
+        # Overlapping occurrences rewrite the same text, keep the first
+        if start < position or (start == end and start == last_insert):
+            continue
+        spliced.append((start, end, replacement))
+        kept[tag] = kept.get(tag, 0) + 1
+        position = end
+        last_insert = start if start == end else None
+    
+    if isinstance(code, EditTracker):
+        return code.splice(spliced), kept
+    return apply_edits(code, spliced), kept
+
+# Cleanup passes run on plain strings, or on an EditTracker when the caller
+# wants the edit spans; these helpers keep one code path for both.
+
+def _text(code):
+    return code.text if isinstance(code, EditTracker) else code
+
+def _set_text(code, new_text):
+    return code.replace_text(new_text) if isinstance(code, EditTracker) else new_text
+
+def _sub(pattern, repl, code):
+    if isinstance(code, EditTracker):
+        return code.sub(pattern, repl)
+    return re.sub(pattern, repl, code)
+
+def _replace(code, old, new):
+    return code.replace(old, new)
+
+def _strip(code):
+    return code.strip()
+
+def _replace_lines(code, new_lines):
+    """Swap in rewritten lines, one per line of the current text"""
+    if not isinstance(code, EditTracker):
+        return '\n'.join(new_lines)
+    
+    edits = []
+    position = 0
+    for line, new_line in zip(code.text.split('\n'), new_lines):
+        if line != new_line:
+            edits.append((position, position + len(line), new_line))
+        position += len(line) + 1
+    return code.splice(edits)
+
 def fix_java_tokens(tokens):
     fixed_tokens = []
     i = 0
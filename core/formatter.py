@@ -1,71 +1,453 @@
-from .detector import CodeIssueDetector
-from .fixer import CodeFixer
-from .language_manager import LanguageManager
-from utils.tokenizer import AdvancedTokenizer
+import time
+
+from . import DEBUG, __version__, get_logger, registry
+from .edits import EditTracker, changed_region, common_prefix_length, common_suffix_length
+from .metrics import new_metrics
+from .ranges import chunk_end, dedent, indent_lines, statement_spans
+from utils.fileio import MappedFile
+
+ENGINES = ['patch', 'printer']
+DEFAULT_MAX_ITERATIONS = 10
+# format_large_file works through the file in chunks of about this size
+LARGE_FILE_CHUNK_BYTES = 256 * 1024
+# Extra bytes decoded past a chunk to find the end of its last statement
+LARGE_FILE_LOOKAHEAD_BYTES = 16 * 1024
+
+logger = get_logger(__name__)
 
 class CodeFormatter:
-    def __init__(self, language='java', style='google'):
+    def __init__(self, language='java', style='google', engine='patch', cache=None):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown formatting engine '{engine}', expected one of {ENGINES}")
         self.language = language
         self.style = style
-        self.language_manager = LanguageManager()
-        self.tokenizer = AdvancedTokenizer(language)
-        self.detector = CodeIssueDetector(language, style)
-        self.fixer = CodeFixer(self.tokenizer)  # FIXED: Only pass tokenizer
+        self.engine = engine
+        # Every pipeline stage is stateless and shared process-wide
+        self.components = registry.get_components(language, style)
+        self.language_manager = registry.get_language_manager()
+        self.tokenizer = self.components.tokenizer
+        self.detector = self.components.detector
+        self.fixer = self.components.fixer
+        self.cache = cache
+    
+    @property
+    def printer(self):
+        return self.components.printer
+    
+    @property
+    def rules_fingerprint(self):
+        return self.components.rules_fingerprint
+    
+    def format_file(self, file_path, converge=False, max_iterations=DEFAULT_MAX_ITERATIONS, metrics=False):
+        """Format a code file with language-specific rules
+        
+        With converge=True the pipeline is re-run on its own output until it
+        stops changing or max_iterations passes have been made. With
+        metrics=True the result carries a 'metrics' section of per-phase
+        perf_counter_ns durations and counters.
+        """
+        start_ns = time.perf_counter_ns()
+        with open(file_path, 'r') as f:
+            original_code = f.read()
+        read_ns = time.perf_counter_ns() - start_ns
+        
+        result = self.format_source(original_code, converge, max_iterations, metrics)
+        if 'metrics' in result:
+            result['metrics']['read_ns'] = read_ns
+        return result
+    
+    def format_many(self, sources, converge=False, max_iterations=DEFAULT_MAX_ITERATIONS, metrics=False):
+        """Format an iterable of source strings, yielding one result per source in order"""
+        for source in sources:
+            yield self.format_source(source, converge, max_iterations, metrics)
     
-    def format_file(self, file_path):
-        """Format a code file with language-specific rules"""
+    def format_source(self, original_code, converge=False, max_iterations=DEFAULT_MAX_ITERATIONS, metrics=False):
+        """Format source code held in memory; same result as format_file
+        
+        With a cache, a hit returns the stored result (marked 'cached')
+        before anything is tokenized.
+        """
+        if self.cache is None:
+            return self._format_source(original_code, converge, max_iterations, metrics)
+        
+        key = self._cache_key('code', original_code, converge, max_iterations)
+        entry = self.cache.get(key)
+        if entry is not None:
+            result = dict(entry, original_code=original_code, cached=True)
+            if result['formatted_code'] is None:
+                result['formatted_code'] = original_code
+            if metrics:
+                result['metrics'] = new_metrics()
+                result['metrics']['bytes_in'] = len(original_code.encode('utf-8'))
+                result['metrics']['bytes_out'] = len(result['formatted_code'].encode('utf-8'))
+            return result
+        
+        result = self._format_source(original_code, converge, max_iterations, metrics)
+        if 'language' in result:  # error fallbacks are not worth remembering
+            entry = {k: v for k, v in result.items() if k not in ('original_code', 'metrics')}
+            if entry['formatted_code'] == original_code:
+                entry['formatted_code'] = None  # already formatted
+            self.cache.put(key, entry)
+        return result
+    
+    def _format_source(self, original_code, converge, max_iterations, metrics):
         try:
-            # Read original code
-            with open(file_path, 'r') as f:
-                original_code = f.read()
+            if self.engine == 'printer':
+                return self._print_code(original_code, converge, max_iterations, metrics)
             
-            print(f"🌐 Processing {self.language.upper()} code...")
-            print(f"📝 Original code ({len(original_code)} chars)")
+            phases = new_metrics() if metrics else None
+            start_ns = time.perf_counter_ns()
+            
+            logger.info("🌐 Processing %s code...", self.language.upper())
+            logger.debug("📝 Original code (%d chars)", len(original_code))
             
             # Tokenize code with language-specific rules
             tokens = self.tokenizer.tokenize(original_code)
-            print(f"🔍 Tokenized {len(tokens)} tokens")
+            tokenized_ns = time.perf_counter_ns()
+            logger.debug("🔍 Tokenized %d tokens", len(tokens))
             
             # Detect issues with language-specific rules
             issues = self.detector.detect_issues(tokens, original_code)
-            print(f"🎯 Found {len(issues)} formatting issues")
+            detected_ns = time.perf_counter_ns()
+            logger.info("🎯 Found %d formatting issues", len(issues))
             
             # Show detected issues
-            for issue in issues[:5]:  # Show first 5 issues
-                print(f"   - {issue['description']}")
-            
-            if len(issues) > 5:
-                print(f"   ... and {len(issues) - 5} more issues")
+            if logger.isEnabledFor(DEBUG):
+                for issue in issues[:5]:  # Show first 5 issues
+                    logger.debug("   - %s", issue['description'])
+                
+                if len(issues) > 5:
+                    logger.debug("   ... and %d more issues", len(issues) - 5)
             
             # Apply fixes
-            formatted_code = self.fixer.apply_fixes(original_code, issues)
+            formatted_code, applied_fixes = self.fixer.apply_fixes(original_code, issues, metrics=phases)
+            
+            fixes_applied = len(applied_fixes)
             
             # Calculate metrics
-            formatting_score = self._calculate_formatting_score(issues, len(self.fixer.applied_fixes))
+            formatting_score = self._calculate_formatting_score(issues, fixes_applied)
             
-            return {
+            result = {
                 'original_code': original_code,
                 'formatted_code': formatted_code,
                 'issues_found': issues,
                 'formatting_score': formatting_score,
-                'fixes_applied': len(self.fixer.applied_fixes),
+                'fixes_applied': fixes_applied,
                 'language': self.language,
                 'style': self.style
             }
+            if converge:
+                result['formatted_code'], result['iterations'], result['converged'] = \
+                    self._converge(original_code, formatted_code, max_iterations, metrics=phases)
+            if phases is not None:
+                phases['tokenize_ns'] += tokenized_ns - start_ns
+                phases['detect_ns'] += detected_ns - tokenized_ns
+                phases.update(tokens=len(tokens), issues=len(issues), fixes_applied=fixes_applied,
+                              bytes_in=len(original_code.encode('utf-8')),
+                              bytes_out=len(result['formatted_code'].encode('utf-8')))
+                result['metrics'] = phases
+            return result
             
         except Exception as e:
-            print(f"❌ Error in format_file: {e}")
+            logger.error("❌ Error in format_source: %s", e)
             # Return original code as fallback
-            with open(file_path, 'r') as f:
-                original_code = f.read()
             return {
                 'original_code': original_code,
                 'formatted_code': original_code,
                 'issues_found': [],
                 'formatting_score': 0.0,
-                'fixes_applied': 0
+                'fixes_applied': 0,
+                'error': str(e)
+            }
+    
+    def format_edits(self, file_path, converge=False, max_iterations=DEFAULT_MAX_ITERATIONS):
+        """Format a code file, returning the changes as edits instead of code
+        
+        result['edits'] is a sorted list of non-overlapping (start, end,
+        replacement) tuples against the file contents; applying them yields
+        exactly what format_file would return as formatted_code.
+        """
+        with open(file_path, 'r') as f:
+            original_code = f.read()
+        return self.format_source_edits(original_code, converge, max_iterations)
+    
+    def format_source_edits(self, original_code, converge=False, max_iterations=DEFAULT_MAX_ITERATIONS):
+        """Edit-span counterpart of format_source"""
+        if self.cache is None:
+            return self._format_source_edits(original_code, converge, max_iterations)
+        
+        key = self._cache_key('edits', original_code, converge, max_iterations)
+        entry = self.cache.get(key)
+        if entry is not None:
+            entry['edits'] = [tuple(edit) for edit in entry['edits']]
+            entry['cached'] = True
+            return entry
+        
+        result = self._format_source_edits(original_code, converge, max_iterations)
+        if 'language' in result:
+            self.cache.put(key, result)
+        return result
+    
+    def _format_source_edits(self, original_code, converge, max_iterations):
+        try:
+            tracker = EditTracker(original_code)
+            if self.engine == 'printer':
+                issues, fixes_applied, formatting_score = [], 0, 100.0
+                spans = self.tokenizer.tokenize_with_spans(original_code)
+                tracker.splice(self.printer.print_edits(original_code, spans))
+                previous_code, iterations = original_code, 1
+                while converge and tracker.text != previous_code and iterations < max_iterations:
+                    previous_code = tracker.text
+                    spans = self.tokenizer.tokenize_with_spans(previous_code)
+                    tracker.splice(self.printer.print_edits(previous_code, spans))
+                    iterations += 1
+                converged = tracker.text == previous_code
+            else:
+                tokens = self.tokenizer.tokenize(original_code)
+                issues = self.detector.detect_issues(tokens, original_code)
+                _, applied_fixes = self.fixer.apply_fixes_tracked(tracker, issues)
+                fixes_applied = len(applied_fixes)
+                formatting_score = self._calculate_formatting_score(issues, fixes_applied)
+                if converge:
+                    _, iterations, converged = self._converge(original_code, tracker.text, max_iterations, tracker)
+            
+            result = {
+                'edits': tracker.edits(),
+                'issues_found': issues,
+                'formatting_score': formatting_score,
+                'fixes_applied': fixes_applied,
+                'language': self.language,
+                'style': self.style
+            }
+            if converge:
+                result['iterations'] = iterations
+                result['converged'] = converged
+            return result
+            
+        except Exception as e:
+            logger.error("❌ Error in format_source_edits: %s", e)
+            return {
+                'edits': [],
+                'issues_found': [],
+                'formatting_score': 0.0,
+                'fixes_applied': 0,
+                'error': str(e)
             }
     
+    def format_lines(self, file_path, lines, converge=False, max_iterations=DEFAULT_MAX_ITERATIONS):
+        """Format only the given line ranges of a code file; see format_source_lines"""
+        with open(file_path, 'r') as f:
+            original_code = f.read()
+        return self.format_source_lines(original_code, lines, converge, max_iterations)
+    
+    def format_source_lines(self, original_code, lines, converge=False, max_iterations=DEFAULT_MAX_ITERATIONS):
+        """Format only the statements covering lines, a list of 1-based inclusive (first, last) ranges
+        
+        Each range is widened to whole statements, dedented, formatted on
+        its own and re-indented, so the cost follows the size of the ranges
+        rather than of the file, and nothing outside them changes. The
+        result is shaped like format_source_edits', plus 'lines': the
+        widened ranges that were formatted.
+        """
+        try:
+            edits = []
+            formatted_lines = []
+            issues = []
+            fixes_applied = 0
+            iterations, converged = 1, True
+            for start, end, first_line, last_line in statement_spans(original_code, lines, self.language):
+                formatted_lines.append((first_line, last_line))
+                indent, region = dedent(original_code[start:end])
+                result = self._format_source(region, converge, max_iterations, False)
+                if 'language' not in result:
+                    raise ValueError(f"lines {first_line}-{last_line} could not be formatted")
+                issues.extend(result['issues_found'])
+                fixes_applied += result['fixes_applied']
+                if converge:
+                    iterations = max(iterations, result['iterations'])
+                    converged = converged and result['converged']
+                
+                # Keep the edit to the part that actually changed
+                old, new = original_code[start:end], indent_lines(result['formatted_code'], indent)
+                prefix = common_prefix_length(old, new)
+                if prefix < len(old) or prefix < len(new):
+                    suffix = common_suffix_length(old, new, min(len(old), len(new)) - prefix)
+                    edits.append((start + prefix, end - suffix, new[prefix:len(new) - suffix]))
+            
+            result = {
+                'edits': edits,
+                'lines': formatted_lines,
+                'issues_found': issues,
+                'formatting_score': self._calculate_formatting_score(issues, fixes_applied),
+                'fixes_applied': fixes_applied,
+                'language': self.language,
+                'style': self.style
+            }
+            if converge:
+                result['iterations'] = iterations
+                result['converged'] = converged
+            return result
+            
+        except Exception as e:
+            logger.error("❌ Error in format_source_lines: %s", e)
+            return {
+                'edits': [],
+                'lines': [],
+                'issues_found': [],
+                'formatting_score': 0.0,
+                'fixes_applied': 0,
+                'error': str(e)
+            }
+    
+    def format_large_file(self, file_path, output=None, converge=False, max_iterations=DEFAULT_MAX_ITERATIONS,
+                          chunk_bytes=LARGE_FILE_CHUNK_BYTES):
+        """Format a file of any size in memory bounded by chunk_bytes, writing the code to output
+        
+        The file is memory-mapped and formatted a chunk at a time, each cut
+        between two statements and written to the text stream output (if
+        any) as soon as it is done, so neither the whole input nor the
+        whole output is ever held. The printer engine carries its open
+        braces from chunk to chunk and prints what format_file would; the
+        patch engine formats each chunk like a format_source_lines range. Returns totals instead of code and
+        issue lists: chunks, bytes_in, chars_out, issues, fixes_applied,
+        formatting_score and changed.
+        """
+        totals = {'chunks': 0, 'bytes_in': 0, 'chars_out': 0, 'issues': 0, 'fixes_applied': 0, 'changed': False}
+        braces = None
+        with MappedFile(file_path) as mapped:
+            start = 0
+            while start < len(mapped):
+                end = mapped.line_end(start + chunk_bytes)
+                code = mapped.text(start, end)
+                # Run on to the end of the statement the chunk stops in
+                lookahead = mapped.text(end, mapped.line_end(end + LARGE_FILE_LOOKAHEAD_BYTES))
+                if lookahead:
+                    extra = lookahead[:chunk_end(code + lookahead, len(code), self.language) - len(code)]
+                    for _ in range(extra.count('\n')):
+                        end = mapped.line_end(end)
+                    if extra and not extra.endswith('\n'):
+                        end = len(mapped)  # ran into the end of the file
+                    code += extra
+                
+                formatted, issues, fixes_applied, braces = \
+                    self._format_chunk(code, braces, converge, max_iterations)
+                if output is not None:
+                    output.write(formatted)
+                
+                totals['chunks'] += 1
+                totals['bytes_in'] += end - start
+                totals['chars_out'] += len(formatted)
+                totals['issues'] += issues
+                totals['fixes_applied'] += fixes_applied
+                totals['changed'] = totals['changed'] or formatted != code
+                mapped.release(end)
+                start = end
+        
+        issues, fixes_applied = totals['issues'], totals['fixes_applied']
+        totals['formatting_score'] = fixes_applied / issues * 100 if issues else 100.0
+        totals.update(language=self.language, style=self.style)
+        return totals
+    
+    def _format_chunk(self, code, braces, converge, max_iterations):
+        """Format one chunk of a large file: (formatted code, issues, fixes_applied, braces after it)
+        
+        braces is the printer's state between chunks, None before the first.
+        """
+        if self.engine == 'printer':
+            if braces is None:
+                # Like the whole file, the first chunk starts at its first token
+                code, braces = code.lstrip(), []
+            opened = list(braces)
+            formatted = self.printer.print_tokens(code, self.tokenizer.tokenize_with_spans(code), braces)
+            previous, iterations = code, 1
+            while converge and formatted != previous and iterations < max_iterations:
+                braces = list(opened)
+                previous, formatted = formatted, \
+                    self.printer.print_tokens(formatted, self.tokenizer.tokenize_with_spans(formatted), braces)
+                iterations += 1
+            return formatted, 0, 0, braces
+        
+        indent, region = dedent(code)
+        result = self._format_source(region, converge, max_iterations, False)
+        return indent_lines(result['formatted_code'], indent), len(result['issues_found']), result['fixes_applied'], braces
+    
+    def _cache_key(self, kind, code, converge, max_iterations):
+        """Cache key covering everything that decides the result for code"""
+        return self.cache.key(code, kind, self.language, self.style, self.engine,
+                              max_iterations if converge else 0, self.rules_fingerprint, __version__)
+    
+    def _converge(self, previous_code, current_code, max_iterations, tracker=None, metrics=None):
+        """Re-run detect and fix until the output is stable
+        
+        Every later pass only re-tokenizes and re-detects the lines changed by
+        the pass before it; regions that came through unchanged were already
+        examined. Passes are recorded on tracker when one is given, and their
+        time is added to metrics. Returns (code, iterations, converged).
+        """
+        iterations = 1
+        while iterations < max_iterations:
+            region = changed_region(previous_code, current_code)
+            if region is None:
+                return current_code, iterations, True
+            
+            start, end = region
+            start_ns = time.perf_counter_ns()
+            tokens = self.tokenizer.tokenize(current_code[start:end])
+            tokenized_ns = time.perf_counter_ns()
+            issues = self.detector.detect_issues(tokens, current_code[start:end])
+            if metrics is not None:
+                metrics['tokenize_ns'] += tokenized_ns - start_ns
+                metrics['detect_ns'] += time.perf_counter_ns() - tokenized_ns
+            if tracker is not None:
+                previous_code, current_code = current_code, self.fixer.apply_fixes_tracked(tracker, issues, metrics=metrics)[0].text
+            else:
+                previous_code, current_code = current_code, self.fixer.apply_fixes(current_code, issues, metrics=metrics)[0]
+            iterations += 1
+        
+        return current_code, iterations, previous_code == current_code
+    
+    def _print_code(self, original_code, converge=False, max_iterations=DEFAULT_MAX_ITERATIONS, metrics=False):
+        """Printer engine: re-emit the token stream without materializing issues
+        
+        In metrics, printing is reported as the fix phase.
+        """
+        phases = new_metrics() if metrics else None
+        spans, formatted_code = self._print_pass(original_code, phases)
+        
+        result = {
+            'original_code': original_code,
+            'formatted_code': formatted_code,
+            'issues_found': [],
+            'formatting_score': 100.0,
+            'fixes_applied': 0,
+            'language': self.language,
+            'style': self.style
+        }
+        if converge:
+            previous_code, iterations = original_code, 1
+            while formatted_code != previous_code and iterations < max_iterations:
+                previous_code, (_, formatted_code) = formatted_code, self._print_pass(formatted_code, phases)
+                iterations += 1
+            result['formatted_code'] = formatted_code
+            result['iterations'] = iterations
+            result['converged'] = formatted_code == previous_code
+        if phases is not None:
+            phases.update(tokens=len(spans), bytes_in=len(original_code.encode('utf-8')),
+                          bytes_out=len(result['formatted_code'].encode('utf-8')))
+            result['metrics'] = phases
+        return result
+    
+    def _print_pass(self, code, phases=None):
+        """Tokenize and reprint code once, returning (spans, printed code)"""
+        start_ns = time.perf_counter_ns()
+        spans = self.tokenizer.tokenize_with_spans(code)
+        tokenized_ns = time.perf_counter_ns()
+        printed = self.printer.print_tokens(code, spans)
+        if phases is not None:
+            phases['tokenize_ns'] += tokenized_ns - start_ns
+            phases['fix_ns'] += time.perf_counter_ns() - tokenized_ns
+        return spans, printed
+    
     def _calculate_formatting_score(self, issues, fixes_applied):
         """Calculate formatting score with severity weighting"""
         if not issues:
@@ -0,0 +1,84 @@
+import subprocess
+
+def changed_files(ref=None, staged=False, pathspecs=None, cwd=None):
+    """Files git reports as added, copied, modified or renamed, relative to cwd
+
+    With staged=True these are the files whose index entry differs from
+    HEAD; otherwise the files whose working tree copy differs from ref
+    (HEAD by default). Deleted and untracked files are never listed, and
+    only files under cwd are. pathspecs narrow the diff like they do on
+    the git command line.
+    """
+    # Outside a repository `git diff` would silently turn into `git diff --no-index`
+    _run_git(['git', 'rev-parse', '--git-dir'], cwd)
+    command = ['git', 'diff', '--name-only', '-z', '--relative', '--diff-filter=ACMR']
+    if staged:
+        command.append('--cached')
+    if ref:
+        command.append(ref)
+    command.append('--')
+    command.extend(pathspecs or [])
+    output = _run_git(command, cwd)
+    return sorted(name for name in output.decode('utf-8').split('\0') if name)
+
+class BlobReader:
+    """Reads blobs through one long-lived `git cat-file --batch` process
+
+    Every read is a request/response pair on the process's pipes, so a
+    whole commit's worth of files costs one spawn instead of one per file.
+
+        with BlobReader() as reader:
+            code = reader.read_staged('src/Main.java')
+    """
+
+    def __init__(self, cwd=None):
+        try:
+            self.process = subprocess.Popen(['git', 'cat-file', '--batch'], cwd=cwd,
+                                            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        except OSError as e:
+            raise OSError(f"Cannot run git: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read(self, spec):
+        """Raw bytes of the blob named by spec (any object name `git cat-file` accepts)"""
+        if '\n' in spec:
+            raise OSError(f"git cat-file --batch cannot name {spec!r}")
+        self.process.stdin.write(spec.encode('utf-8') + b'\n')
+        self.process.stdin.flush()
+        header = self.process.stdout.readline()
+        if not header:
+            raise OSError("git cat-file exited unexpectedly")
+        fields = header.split()
+        if len(fields) != 3:
+            # '<spec> missing' or '<spec> ambiguous'
+            raise OSError(f"git cannot read {spec}: {header.decode('utf-8', 'replace').strip()}")
+        data = self.process.stdout.read(int(fields[2]) + 1)
+        return data[:-1]
+
+    def read_staged(self, path):
+        """Staged content of path (relative to the current directory) as text
+
+        Line endings are normalized the way reading the file in text mode
+        would, so the result formats exactly like the file on disk would.
+        """
+        code = self.read(':./' + path).decode('utf-8')
+        return code.replace('\r\n', '\n').replace('\r', '\n')
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.stdout.close()
+        self.process.wait()
+
+def _run_git(command, cwd=None):
+    try:
+        completed = subprocess.run(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as e:
+        raise OSError(f"Cannot run git: {e}")
+    if completed.returncode != 0:
+        raise OSError(completed.stderr.decode('utf-8', 'replace').strip() or f"{' '.join(command)} failed")
+    return completed.stdout
@@ -1,37 +1,65 @@
+import importlib
 import os
 
-# Import all rule files
-try:
-    from config.rules.java_rules import JAVA_RULES
-    from config.rules.python_rules import PYTHON_RULES
-    from config.rules.cpp_rules import CPP_RULES
-except ImportError:
-    # Fallback rules if files don't exist
-    JAVA_RULES = {
+# Rule tables are imported on first use, so a run only loads the languages it formats
+RULE_MODULES = {
+    'java': ('config.rules.java_rules', 'JAVA_RULES'),
+    'python': ('config.rules.python_rules', 'PYTHON_RULES'),
+    'cpp': ('config.rules.cpp_rules', 'CPP_RULES'),
+}
+
+# The one map from file extension to language, for detecting a file's
+# language and for picking source files out of directories alike
+EXTENSION_LANGUAGES = {
+    '.java': 'java',
+    '.py': 'python',
+    '.pyw': 'python',
+    '.cpp': 'cpp',
+    '.cc': 'cpp',
+    '.c': 'cpp',
+    '.h': 'cpp',
+    '.hpp': 'cpp',
+    '.cxx': 'cpp',
+}
+
+# Fallback rules if files don't exist
+FALLBACK_RULES = {
+    'java': {
         'indentation': {'size': 4, 'use_tabs': False},
         'braces': {'class_brace': 'same_line', 'method_brace': 'same_line'},
         'spacing': {'after_keywords': ['if', 'for', 'while'], 'around_operators': ['=', '==', '+', '-']}
-    }
-    PYTHON_RULES = {
+    },
+    'python': {
         'indentation': {'size': 4, 'use_tabs': False},
         'spacing': {'after_commas': True, 'around_operators': True}
-    }
-    CPP_RULES = {
+    },
+    'cpp': {
         'indentation': {'size': 2, 'use_tabs': False},
         'braces': {'class_brace': 'same_line', 'function_brace': 'same_line'}
-    }
+    },
+}
+
+def load_rules(language):
+    """Import the rule table of one language"""
+    module_name, attribute = RULE_MODULES[language]
+    try:
+        return getattr(importlib.import_module(module_name), attribute)
+    except ImportError:
+        return FALLBACK_RULES[language]
 
 class LanguageManager:
     def __init__(self):
-        self.languages = {
-            'java': JAVA_RULES,
-            'python': PYTHON_RULES, 
-            'cpp': CPP_RULES
-        }
+        # Rules of the languages loaded so far
+        self.languages = {}
     
     def get_rules(self, language):
         """Get formatting rules for specific language"""
-        return self.languages.get(language, JAVA_RULES)
+        if language not in RULE_MODULES:
+            language = 'java'
+        rules = self.languages.get(language)
+        if rules is None:
+            rules = self.languages[language] = load_rules(language)
+        return rules
     
     def detect_language(self, file_path):
         """Auto-detect language from file extension"""
@@ -39,32 +67,17 @@ class LanguageManager:
             return 'java'
             
         extension = os.path.splitext(file_path)[1].lower()
-        extension_map = {
-            '.java': 'java',
-            '.py': 'python', 
-            '.cpp': 'cpp',
-            '.cc': 'cpp',
-            '.c': 'cpp',
-            '.h': 'cpp',
-            '.hpp': 'cpp',
-            '.cxx': 'cpp'
-        }
-        return extension_map.get(extension, 'java')
+        return EXTENSION_LANGUAGES.get(extension, 'java')
     
     def get_file_extensions(self, language):
         """Get valid file extensions for a language"""
-        extension_map = {
-            'java': ['.java'],
-            'python': ['.py', '.pyw'],
-            'cpp': ['.cpp', '.cc', '.c', '.h', '.hpp', '.cxx']
-        }
-        return extension_map.get(language, [])
+        return [extension for extension, lang in EXTENSION_LANGUAGES.items() if lang == language]
     
     def validate_language_support(self, file_path):
         """Check if file type is supported"""
         language = self.detect_language(file_path)
-        return language in self.languages
+        return language in RULE_MODULES
     
     def get_supported_languages(self):
         """Get list of all supported languages"""
-        return list(self.languages.keys())
\ No newline at end of file
+        return list(RULE_MODULES)
\ No newline at end of file
@@ -0,0 +1,57 @@
+PHASES = ['read_ns', 'tokenize_ns', 'detect_ns', 'fix_ns', 'cleanup_ns']
+COUNTERS = ['tokens', 'issues', 'fixes_applied', 'bytes_in', 'bytes_out']
+PERCENTILES = [50, 95, 99]
+
+
+def new_metrics():
+    """Empty metrics section for a format result"""
+    metrics = dict.fromkeys(PHASES, 0)
+    metrics.update(dict.fromkeys(COUNTERS, 0))
+    return metrics
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    rank = max(1, -(-p * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+class MetricsAggregator:
+    """Collects the metrics of many format results for per-phase percentiles
+
+    Samples are kept per language and under 'all'; a 'total_ns' phase is
+    the sum of the per-phase times of each file.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self.totals = {}
+
+    def add(self, result):
+        """Record one format result; results without metrics are ignored"""
+        metrics = result.get('metrics')
+        if not metrics:
+            return
+        for key in ('all', result.get('language', 'unknown')):
+            samples = self.samples.setdefault(key, {})
+            for phase in PHASES:
+                samples.setdefault(phase, []).append(metrics.get(phase, 0))
+            samples.setdefault('total_ns', []).append(sum(metrics.get(phase, 0) for phase in PHASES))
+
+            totals = self.totals.setdefault(key, dict.fromkeys(COUNTERS, 0))
+            for counter in COUNTERS:
+                totals[counter] += metrics.get(counter, 0)
+
+    def summary(self):
+        """{language: {'files', counter totals, phase: {'p50', 'p95', 'p99'}}}"""
+        summary = {}
+        for key, samples in self.samples.items():
+            entry = {'files': len(samples['total_ns'])}
+            entry.update(self.totals[key])
+            for phase, values in samples.items():
+                values = sorted(values)
+                entry[phase] = {f'p{p}': percentile(values, p) for p in PERCENTILES}
+            summary[key] = entry
+        return summary
@@ -0,0 +1,361 @@
+import keyword
+
+from core.language_manager import LanguageManager
+
+
+class TokenPrinter:
+    """Emit formatted code straight from the token stream.
+
+    This is the 'printer' engine: instead of detecting issues and patching
+    the text, every token is re-emitted with the separator chosen by a
+    per-language spacing table built from config/rules.
+    """
+
+    # Operators written with spaces on both sides when operator spacing is on
+    BINARY_OPERATORS = {
+        'java': ['=', '==', '!=', '<', '>', '<=', '>=', '+', '-', '*', '/', '%',
+                 '&&', '||', '&', '|', '^', '<<', '>>', '>>>', '?', '->',
+                 '+=', '-=', '*=', '/=', '%=', '&=', '|=', '^=', '<<=', '>>='],
+        'python': ['=', '==', '!=', '<', '>', '<=', '>=', '+', '-', '*', '/', '%',
+                   '**', '//', '&', '|', '^', '<<', '>>', '->', ':=', '@=',
+                   '+=', '-=', '*=', '/=', '%=', '**=', '//=', '&=', '|=', '^=',
+                   '<<=', '>>='],
+        'cpp': ['=', '==', '!=', '<', '>', '<=', '>=', '+', '-', '*', '/', '%',
+                '&&', '||', '&', '|', '^', '<<', '>>', '?',
+                '+=', '-=', '*=', '/=', '%=', '&=', '|=', '^=', '<<=', '>>='],
+    }
+
+    # Operator pieces the tokenizers emit separately; rejoined when adjacent in the source
+    COMPOUND_OPERATORS = {'==', '!=', '<=', '>=', '+=', '-=', '*=', '/=', '%=',
+                          '&=', '|=', '^=', '**', '//', '->', '::', '<<', '>>',
+                          '>>>', ':=', '@=', '**=', '//=', '<<=', '>>='}
+
+    UNARY_OPERATORS = {'+', '-', '!', '~', '*', '**', '&'}
+
+    # Keywords that keep a space before a following '(' or '['
+    STATEMENT_KEYWORDS = {
+        'java': ['if', 'for', 'while', 'switch', 'catch', 'synchronized', 'try',
+                 'return', 'throw', 'else', 'do', 'case', 'assert', 'finally'],
+        'python': [kw for kw in keyword.kwlist if kw not in ('True', 'False', 'None')],
+        'cpp': ['if', 'for', 'while', 'switch', 'catch', 'try', 'return', 'throw',
+                'else', 'do', 'case', 'sizeof', 'delete'],
+    }
+
+    MEMBER_ACCESS = {
+        'java': {'.', '::'},
+        'python': {'.'},
+        'cpp': {'.', '::', '->'},
+    }
+
+    CPP_TYPES = {'void', 'int', 'long', 'short', 'float', 'double', 'bool', 'char',
+                 'auto', 'unsigned', 'signed', 'const', 'string', 'size_t'}
+
+    PYTHON_BLOCK_KEYWORDS = {'def', 'class', 'if', 'elif', 'else', 'for', 'while',
+                             'try', 'except', 'finally', 'with', 'async'}
+
+    STRING_PREFIXES = {'f', 'r', 'b', 'u', 'rb', 'br', 'fr', 'rf',
+                       'F', 'R', 'B', 'U', 'Rb', 'bR', 'fR', 'Fr', 'RB', 'BR', 'FR', 'RF'}
+
+    def __init__(self, language='java', rules=None):
+        self.language = language
+        self.rules = rules if rules is not None else LanguageManager().get_rules(language)
+        self.table = self._build_spacing_table(self.rules)
+
+    def _build_spacing_table(self, rules):
+        """Derive the separator decisions from the language rules"""
+        spacing = rules.get('spacing', {})
+        indentation = rules.get('indentation', {})
+        blank_lines = rules.get('blank_lines', {})
+        pointers = rules.get('pointer_reference', {})
+
+        operators = self.BINARY_OPERATORS.get(self.language, self.BINARY_OPERATORS['java'])
+        around_operators = spacing.get('around_operators', True)
+        if around_operators is True:
+            spaced_operators = set(operators)
+        elif around_operators:
+            spaced_operators = set(operators) | set(around_operators)
+        else:
+            spaced_operators = set()
+
+        keywords = set(self.STATEMENT_KEYWORDS.get(self.language, []))
+        keywords.update(spacing.get('after_keywords', []))
+
+        indent_size = indentation.get('size', 4)
+
+        return {
+            'operators': set(operators) | spaced_operators,
+            'spaced_operators': spaced_operators,
+            'keywords': keywords,
+            'member_access': self.MEMBER_ACCESS.get(self.language, {'.'}),
+            'after_commas': spacing.get('after_commas', True),
+            'before_brace': spacing.get('before_class_brace', True) and spacing.get('before_method_brace', True),
+            'pointer_left': pointers.get('pointer_alignment', 'left') == 'left',
+            'indent_unit': '\t' if indentation.get('use_tabs', False) else ' ' * indent_size,
+            'max_blank_lines': max(blank_lines.values()) if blank_lines else 1,
+        }
+
+    def print_tokens(self, code, spans, braces=None):
+        """Render the (token, start, end) spans of code as formatted source
+        
+        With braces, code is a piece of a larger file that starts right
+        after a line break and is printed the way it would be as part of
+        the whole file, indentation of its first line and blank lines
+        before it included. braces lists the kinds ('block' or 'init') of
+        the braces open before the piece and is updated in place to those
+        open after it, ready for the next piece.
+        """
+        return ''.join(text for _, _, text in self._layout(code, spans, braces))
+
+    def print_edits(self, code, spans):
+        """Same output as print_tokens, as (start, end, replacement) edits of code"""
+        return [(start, end, text) for start, end, text in self._layout(code, spans)
+                if code[start:end] != text]
+
+    def _layout(self, code, spans, braces=None):
+        """Cover code with (start, end, text) segments whose texts join into the output"""
+        if not spans and braces is not None:
+            return [(0, len(code), code)]
+        if not spans:
+            stripped = code.strip()
+            start = code.find(stripped) if stripped else 0
+            return [(0, start, ''), (start, start + len(stripped), stripped), (start + len(stripped), len(code), '')]
+
+        tokens = self._merge_compound_operators(spans)
+        if self.language == 'python':
+            out = self._print_python(code, tokens, braces is not None)
+        else:
+            out = self._print_braced(code, tokens, braces)
+
+        if braces is None:
+            out.insert(0, (0, tokens[0][1], ''))
+        out.append((out[-1][1], len(code), '\n' if code.endswith('\n') else ''))
+        return out
+
+    def _merge_compound_operators(self, spans):
+        """Rejoin operators such as '==' or '::' that were tokenized piecewise"""
+        merged = []
+        for token, start, end in spans:
+            if merged:
+                prev_token, prev_start, prev_end = merged[-1]
+                if prev_end == start and prev_token + token in self.COMPOUND_OPERATORS:
+                    merged[-1] = (prev_token + token, prev_start, end)
+                    continue
+            merged.append((token, start, end))
+        return merged
+
+    def _is_word(self, token):
+        """Identifiers, keywords, numbers and literals"""
+        return token[0].isalnum() or token[0] in '_"\'$'
+
+    def _is_unary(self, token, prev):
+        """Check if an operator token is used as a prefix operator"""
+        if token in ('!', '~'):
+            return True
+        if token not in self.UNARY_OPERATORS:
+            return False
+        if prev is None or prev in self.table['keywords']:
+            return True
+        return not self._is_word(prev) and prev not in (')', ']', '}', '++', '--')
+
+    def _blank_lines(self, newlines):
+        return '\n' * min(newlines, self.table['max_blank_lines'] + 1)
+
+    def _separator(self, prev, token, context):
+        """Choose the separator between two tokens on the same line"""
+        table = self.table
+
+        # Attached punctuation
+        if token in (',', ';', ')', ']') or token in table['member_access']:
+            return ''
+        if prev in ('(', '[', '@') or prev in table['member_access']:
+            return ''
+        if context.get('prev_unary'):
+            return ''
+        if context.get('prev_pointer'):
+            return ' ' if table['pointer_left'] else ''
+        if context.get('pointer'):
+            return '' if table['pointer_left'] else ' '
+
+        if token in ('++', '--'):
+            return '' if self._is_word(prev) or prev in (')', ']') else ' '
+        if prev in ('++', '--'):
+            return '' if self._is_word(token) else ' '
+        if prev == ',':
+            return ' ' if table['after_commas'] else ''
+        if prev == ';':
+            return ' '
+
+        if token == ':' or prev == ':':
+            return self._colon_separator(token, context)
+
+        # Blocks get padded braces, initializers and Python literals stay tight
+        if token == '{':
+            if context.get('brace') == 'init':
+                return '' if prev == '{' else ' '
+            return ' ' if table['before_brace'] else ''
+        if prev == '{':
+            return '' if token == '}' or context.get('brace') == 'init' else ' '
+        if token == '}':
+            return '' if context.get('brace') == 'init' else ' '
+
+        if token in ('(', '['):
+            if prev in table['keywords']:
+                return ' '
+            if prev in table['operators']:
+                return ' ' if prev in table['spaced_operators'] else ''
+            return ''
+
+        if token in table['operators']:
+            return ' ' if token in table['spaced_operators'] else ''
+        if prev in table['operators']:
+            return ' ' if prev in table['spaced_operators'] else ''
+
+        return ' '
+
+    def _colon_separator(self, token, context):
+        """Spacing for ':' as a label, slice, ternary, annotation or dict marker"""
+        if self.language == 'python':
+            if context.get('bracket') == '[':
+                return ''
+            return '' if token == ':' else ' '
+        if context.get('label'):
+            return '' if token == ':' else ' '
+        return ' '
+
+    def _is_pointer_declarator(self, tokens, index):
+        """C++ 'Type* name' / 'Type& name' declarations"""
+        if self.language != 'cpp' or tokens[index][0] not in ('*', '&') or index == 0:
+            return False
+        prev = tokens[index - 1][0]
+        following = tokens[index + 1][0] if index + 1 < len(tokens) else ''
+        is_type = prev in self.CPP_TYPES or prev == '>' or prev[0].isupper()
+        return is_type and following[:1].isalpha()
+
+    def _print_braced(self, code, tokens, braces=None):
+        """Printer for brace-delimited languages (Java, C++), as layout segments"""
+        table = self.table
+        out = []
+        piece = braces is not None
+        brace_stack = braces if piece else []
+        paren_depth = 0
+        label = False
+        prev = None
+        prev_end = 0
+        prev_unary = prev_pointer = False
+        skip_until = 0
+
+        for index, (token, start, end) in enumerate(tokens):
+            if start < skip_until:
+                continue
+            newlines = code.count('\n', prev_end, start) if prev is not None or piece else 0
+            if prev is None and piece:
+                newlines += 1  # the line break just before the piece
+
+            # Preprocessor directives are copied through untouched
+            if self.language == 'cpp' and token.startswith('#') and (prev is None or newlines):
+                line_end = code.find('\n', start)
+                skip_until = len(code) if line_end == -1 else line_end
+                if prev is not None or piece:
+                    out.append((prev_end, start, self._blank_lines(newlines)[prev is None:]))
+                out.append((start, skip_until, code[start:skip_until].rstrip()))
+                prev, prev_end = '#', skip_until
+                prev_unary = prev_pointer = False
+                continue
+
+            if token == '{':
+                is_init = prev in ('=', ']') or (prev in (',', '{') and brace_stack and brace_stack[-1] == 'init')
+                brace_stack.append('init' if is_init else 'block')
+            closing = brace_stack.pop() if token == '}' and brace_stack else None
+            pointer = self._is_pointer_declarator(tokens, index)
+
+            if prev is None and not piece:
+                separator = ''
+            elif newlines:
+                depth = sum(1 for kind in brace_stack if kind == 'block')
+                if token == '{' and brace_stack[-1] == 'block':
+                    depth -= 1
+                continuation = 2 if paren_depth > 0 else 0
+                separator = self._blank_lines(newlines)[prev is None:] + table['indent_unit'] * (depth + continuation)
+            else:
+                context = {
+                    'prev_unary': prev_unary,
+                    'prev_pointer': prev_pointer,
+                    'pointer': pointer,
+                    'label': label,
+                    'brace': closing or (brace_stack[-1] if brace_stack else None),
+                }
+                separator = self._separator(prev, token, context)
+            if prev is not None or piece:
+                out.append((prev_end, start, separator))
+            out.append((start, end, token))
+
+            if token == '(':
+                paren_depth += 1
+            elif token == ')':
+                paren_depth = max(0, paren_depth - 1)
+            if token in ('case', 'default'):
+                label = True
+            elif token in (':', ';', '{', '}'):
+                label = False
+
+            prev_unary = not pointer and self._is_unary(token, prev)
+            prev_pointer = pointer
+            prev, prev_end = token, end
+
+        return out
+
+    def _print_python(self, code, tokens, piece=False):
+        """Printer for Python, which keeps the source indentation of each line, as layout segments"""
+        table = self.table
+        out = []
+        brackets = []
+        line_indent = ''
+        line_first = None
+        split_level = 0
+        prev = None
+        prev_end = 0
+        prev_unary = False
+
+        for token, start, end in tokens:
+            gap = code[prev_end:start]
+            newlines = gap.count('\n') if prev is not None or piece else 0
+            if prev is None and piece:
+                newlines += 1  # the line break just before the piece
+
+            if prev is None or newlines:
+                indent = gap[gap.rfind('\n') + 1:]
+                if not brackets:
+                    line_indent = indent
+                    line_first = token
+                    split_level = 0
+                if prev is not None or piece:
+                    out.append((prev_end, start, self._blank_lines(newlines)[prev is None:] + indent))
+            elif self._is_block_colon(prev, brackets, line_first) and not token.startswith('#'):
+                # A body written on the same line as its header gets its own line
+                split_level += 1
+                out.append((prev_end, start, '\n' + line_indent + table['indent_unit'] * split_level))
+                line_first = token
+            elif prev in self.STRING_PREFIXES and token[0] in '"\'' and prev_end == start:
+                out.append((prev_end, start, ''))
+            else:
+                context = {
+                    'prev_unary': prev_unary,
+                    'brace': 'init',
+                    'bracket': brackets[-1] if brackets else None,
+                }
+                out.append((prev_end, start, self._separator(prev, token, context)))
+            out.append((start, end, token))
+
+            if token in ('(', '[', '{'):
+                brackets.append(token)
+            elif token in (')', ']', '}') and brackets:
+                brackets.pop()
+
+            prev_unary = self._is_unary(token, prev)
+            prev, prev_end = token, end
+
+        return out
+
+    def _is_block_colon(self, token, brackets, line_first):
+        """A ':' closing the header of a compound statement"""
+        return token == ':' and not brackets and line_first in self.PYTHON_BLOCK_KEYWORDS
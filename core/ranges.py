@@ -0,0 +1,209 @@
+import os
+import re
+
+# How far a range is widened, in lines each way, looking for the statement around it
+MAX_WIDENING_LINES = 200
+# Lines are located by counting newlines a block at a time, halving the block near the
+# target, before walking the last few one by one
+_COUNT_BLOCK = 1 << 16
+_MIN_BLOCK = 64
+
+_INDENT = re.compile(r'[ \t]*')
+# One-line string literals and line comments, whose brackets and quotes chunk_end ignores;
+# triple quotes match on their own so they are kept
+_PYTHON_NOISE = re.compile(r'"""|\'\'\'|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|#[^\n]*')
+_BRACED_NOISE = re.compile(r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|//[^\n]*')
+
+def parse_line_range(text):
+    """(first, last) for 'START-END' or a single 'LINE'; 1-based and inclusive"""
+    first, _, last = text.partition('-')
+    try:
+        first = int(first)
+        last = int(last) if last else first
+    except ValueError:
+        raise ValueError(f"Invalid line range '{text}', expected START-END")
+    if first < 1 or last < first:
+        raise ValueError(f"Invalid line range '{text}', expected 1 <= START <= END")
+    return first, last
+
+def skip_lines(text, count, position=0):
+    """Offset just past the count-th newline after position (len(text) if there are fewer)"""
+    remaining = count
+    block = _COUNT_BLOCK
+    while remaining > 0 and block >= _MIN_BLOCK:
+        newlines = text.count('\n', position, position + block)
+        if newlines >= remaining:
+            block //= 2  # the line is in this block: narrow it down
+        elif position + block >= len(text):
+            return len(text)
+        else:
+            remaining -= newlines
+            position += block
+    for _ in range(remaining):
+        found = text.find('\n', position)
+        if found == -1:
+            return len(text)
+        position = found + 1
+    return position
+
+def statement_spans(code, line_ranges, language='java'):
+    """Sorted, non-overlapping (start, end, first_line, last_line) spans of code covering line_ranges
+
+    Every span is made of whole lines and widened, by at most
+    MAX_WIDENING_LINES each way, so it does not start or end in the middle
+    of a statement; first_line and last_line are its 1-based line numbers.
+    Only the lines around each range are looked at, never the whole file.
+    """
+    spans = []
+    for first, last in sorted(line_ranges):
+        start = skip_lines(code, first - 1)
+        end = skip_lines(code, last - first + 1, start)
+        if start == end:
+            continue  # past the end of the file
+        widened_start, end = _widen(code, start, end, language)
+        first -= code.count('\n', widened_start, start)
+        last = first + code.count('\n', widened_start, end - 1)
+        if spans and widened_start <= spans[-1][1]:
+            previous = spans[-1]
+            if end > previous[1]:
+                spans[-1] = (previous[0], end, previous[2], last)
+        else:
+            spans.append((widened_start, end, first, last))
+    return spans
+
+def dedent(text):
+    """(indent, text without it): the indentation common to every non-blank line, removed"""
+    lines = text.split('\n')
+    indents = [_INDENT.match(line).group() for line in lines if line.strip()]
+    indent = os.path.commonprefix(indents) if indents else ''
+    if not indent:
+        return '', text
+    return indent, '\n'.join(line[len(indent):] for line in lines)
+
+def indent_lines(text, indent):
+    """Prefix every non-blank line of text with indent"""
+    if not indent:
+        return text
+    return '\n'.join(indent + line if line.strip() else line for line in text.split('\n'))
+
+def chunk_end(code, end, language='java'):
+    """Offset at or after end (a line start) where code can be cut between two statements
+
+    Unlike the widening of statement_spans, open blocks do not matter, so
+    this also finds cuts between the statements of a block; parentheses
+    and brackets opened in code[:end] must be closed, and so must braces
+    in Python, triple-quoted strings and block comments. A cut never
+    follows a blank line, so blank lines stay with the code after them,
+    and in braced languages never follows a line ending in '{', which may
+    open an initializer rather than a block. Looks at most
+    MAX_WIDENING_LINES lines ahead.
+    """
+    python = language == 'python'
+    bracket_depth = _depth if python else _paren_depth
+    text = _strip_noise(code[:end], language)
+    depth = bracket_depth(text)
+    literals = _literals(text, language)
+    for _ in range(MAX_WIDENING_LINES):
+        if end == len(code):
+            break
+        line = code[code.rfind('\n', 0, end - 1) + 1:end]
+        in_literal = literals % 2 if python else literals > 0
+        if depth <= 0 and not in_literal and line.strip() and _ends_statement(line, language) and \
+                (python or not line.rstrip().endswith('{')):
+            break
+        found = code.find('\n', end)
+        following = len(code) if found == -1 else found + 1
+        text = _strip_noise(code[end:following], language)
+        depth += bracket_depth(text)
+        literals += _literals(text, language)
+        end = following
+    return end
+
+def _widen(code, start, end, language):
+    """Grow start and end line by line to statement boundaries with balanced brackets
+
+    A range starting inside a block comment or triple-quoted string starts
+    where that opens, and none ends inside one.
+    """
+    start = _literal_start(code, start, language)
+    depth = _depth(code[start:end])
+    literals = _literals(_strip_noise(code[start:end], language), language)
+    for _ in range(MAX_WIDENING_LINES):
+        if start == 0:
+            break
+        previous = code.rfind('\n', 0, start - 1) + 1
+        if depth >= 0 and _ends_statement(code[previous:start], language):
+            break
+        depth += _depth(code[previous:start])
+        start = previous
+    for _ in range(MAX_WIDENING_LINES):
+        if end == len(code):
+            break
+        last = code.rfind('\n', start, end - 1) + 1
+        in_literal = literals % 2 if language == 'python' else literals > 0
+        if depth <= 0 and not in_literal and _ends_statement(code[last:end], language):
+            break
+        found = code.find('\n', end)
+        following = len(code) if found == -1 else found + 1
+        depth += _depth(code[end:following])
+        literals += _literals(_strip_noise(code[end:following], language), language)
+        end = following
+    return start, end
+
+def _literal_start(code, start, language):
+    """Start of the line opening the block comment or triple-quoted string that start (a line start) is in
+
+    start itself if it is in neither, going by at most MAX_WIDENING_LINES
+    lines before it.
+    """
+    line_start = start
+    for _ in range(MAX_WIDENING_LINES):
+        if line_start == 0:
+            break
+        line_start = code.rfind('\n', 0, line_start - 1) + 1
+    literals = 0
+    opened = start
+    while line_start < start:
+        line_end = code.find('\n', line_start, start) + 1 or start
+        count = _literals(_strip_noise(code[line_start:line_end], language), language)
+        # A block comment closed before the lines looked at does not count
+        literals = literals + count if language == 'python' else max(0, literals + count)
+        in_literal = literals % 2 if language == 'python' else literals > 0
+        if not in_literal:
+            opened = start
+        elif count and (language == 'python' or opened == start):
+            # Python lines leaving a string open open it; a /* inside a block comment opens nothing
+            opened = line_start
+        line_start = line_end
+    return opened
+
+def _depth(text):
+    """Open minus closed brackets in text"""
+    return sum(text.count(c) for c in '([{') - sum(text.count(c) for c in ')]}')
+
+def _paren_depth(text):
+    """Open minus closed parentheses and square brackets in text"""
+    return text.count('(') + text.count('[') - text.count(')') - text.count(']')
+
+def _strip_noise(text, language):
+    """text without its one-line string literals and line comments"""
+    if language == 'python':
+        return _PYTHON_NOISE.sub(lambda match: match.group() if match.group() in ('"""', "'''") else '', text)
+    return _BRACED_NOISE.sub('', text)
+
+def _literals(text, language):
+    """Triple quotes in Python text; block comments opened minus closed in other text"""
+    if language == 'python':
+        return text.count('"""') + text.count("'''")
+    return text.count('/*') - text.count('*/')
+
+def _ends_statement(line, language):
+    """Whether nothing on the next line can still belong to the statement on this one"""
+    text = line.strip()
+    if language == 'python':
+        return not text.endswith(('\\', ',', '(', '[', '{'))
+    if not text or text.startswith(('//', '*', '/*')) or text.endswith('*/'):
+        return True
+    if text.startswith('#'):
+        return not text.endswith('\\')
+    return text.endswith((';', '{', '}', ':'))
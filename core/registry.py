@@ -0,0 +1,85 @@
+# threading.RLock is _thread.RLock; threading itself costs ~1.5 ms on every cold start
+import _thread
+
+from .detector import CodeIssueDetector
+from .fixer import CodeFixer
+from .language_manager import LanguageManager
+from utils.tokenizer import AdvancedTokenizer
+
+# Process-wide, built on first use and kept warm for every later formatter
+_lock = _thread.RLock()
+_language_manager = None
+_components = {}
+_formatters = {}
+
+class FormatterComponents:
+    """The parts of a formatter pipeline for one (language, style); all stateless"""
+
+    def __init__(self, language, style, language_manager):
+        self.language = language
+        self.style = style
+        self.rules = language_manager.get_rules(language)
+        self.tokenizer = AdvancedTokenizer(language)
+        self.detector = CodeIssueDetector(language, style, language_manager=language_manager)
+        self.fixer = CodeFixer(self.tokenizer)
+        # Only needed by the printer engine and by cached runs; built (and imported) on first use
+        self._printer = None
+        self._rules_fingerprint = None
+
+    @property
+    def printer(self):
+        if self._printer is None:
+            from .printer import TokenPrinter
+            self._printer = TokenPrinter(self.language, self.rules)
+        return self._printer
+
+    @property
+    def rules_fingerprint(self):
+        if self._rules_fingerprint is None:
+            from .cache import rules_fingerprint
+            self._rules_fingerprint = rules_fingerprint(self.rules)
+        return self._rules_fingerprint
+
+def get_language_manager():
+    """The shared LanguageManager"""
+    global _language_manager
+    if _language_manager is None:
+        with _lock:
+            if _language_manager is None:
+                _language_manager = LanguageManager()
+    return _language_manager
+
+def get_components(language='java', style='google'):
+    """Shared FormatterComponents for (language, style)"""
+    key = (language, style)
+    components = _components.get(key)
+    if components is None:
+        language_manager = get_language_manager()
+        with _lock:
+            components = _components.get(key)
+            if components is None:
+                components = FormatterComponents(language, style, language_manager)
+                _components[key] = components
+    return components
+
+def get_formatter(language='java', style='google', engine='patch'):
+    """A shared CodeFormatter for (language, style, engine), safe to use from several threads"""
+    from .formatter import CodeFormatter
+
+    key = (language, style, engine)
+    formatter = _formatters.get(key)
+    if formatter is None:
+        with _lock:
+            formatter = _formatters.get(key)
+            if formatter is None:
+                formatter = CodeFormatter(language=language, style=style, engine=engine)
+                _formatters[key] = formatter
+    return formatter
+
+def clear():
+    """Forget every shared component, e.g. after the rules were changed"""
+    global _language_manager
+    with _lock:
+        _language_manager = None
+        _components.clear()
+        _formatters.clear()
@@ -0,0 +1,89 @@
+import time
+
+def build_report(results, shard=None, wall_time=None):
+    """JSON-ready report of a batch run's [(path, result)], summarised like simple_test_results.json
+
+    shard is the 'K/N' the run covered, if it was sharded; wall_time the
+    seconds the whole run took.
+    """
+    details = [{
+        'path': path,
+        'language': result.get('language'),
+        'changed': bool(result['edits']),
+        'issues_found': len(result['issues_found']),
+        'fixes_applied': result['fixes_applied'],
+        'formatting_score': result['formatting_score'],
+        'processing_time': result.get('processing_time', 0.0),
+        'error': result.get('error'),
+    } for path, result in results]
+    return _report(details, [shard], [wall_time] if wall_time is not None else [])
+
+def merge_reports(reports):
+    """One report for the files of several, e.g. the per-shard reports of one sharded run
+
+    The summary is recomputed from the merged per-file results, so it is
+    what a single unsharded run would have reported; wall_time is the
+    slowest run's, as the runs went side by side. Raises ValueError if a
+    file appears in more than one report.
+    """
+    details = {}
+    for report in reports:
+        for detail in report['detailed_results']:
+            if detail['path'] in details:
+                raise ValueError(f"{detail['path']} appears in more than one report")
+            details[detail['path']] = detail
+    shards = [shard for report in reports for shard in report['shards']]
+    wall_times = [seconds for report in reports for seconds in report['shard_wall_times']]
+    return _report(sorted(details.values(), key=lambda detail: detail['path']), shards, wall_times)
+
+def missing_shards(report):
+    """The 'K/N' shards a sharded report does not cover yet (none if it was not sharded)"""
+    shards = [shard for shard in report['shards'] if shard]
+    if not shards:
+        return []
+    count = max(int(shard.split('/')[1]) for shard in shards)
+    return [f"{index}/{count}" for index in range(1, count + 1) if f"{index}/{count}" not in shards]
+
+def _report(details, shards, wall_times):
+    total_files = len(details)
+    total_issues = sum(detail['issues_found'] for detail in details)
+    total_fixes = sum(detail['fixes_applied'] for detail in details)
+    total_time = sum(detail['processing_time'] for detail in details)
+
+    report = {
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'shards': shards,
+        'total_files': total_files,
+        'changed_files': sum(1 for detail in details if detail['changed']),
+        'failed_files': sum(1 for detail in details if detail.get('error')),
+        'total_issues': total_issues,
+        'total_fixes': total_fixes,
+        'fix_success_rate': (total_fixes / total_issues * 100) if total_issues > 0 else 100,
+        'average_formatting_score': (sum(detail['formatting_score'] for detail in details) / total_files
+                                     if total_files else 100.0),
+        'total_processing_time': total_time,
+        'average_processing_time': total_time / total_files if total_files else 0.0,
+        'wall_time': max(wall_times) if wall_times else None,
+        'shard_wall_times': wall_times,
+        'language_breakdown': {},
+        'detailed_results': details,
+    }
+
+    # Calculate language breakdown
+    language_stats = {}
+    for detail in details:
+        stats = language_stats.setdefault(detail['language'] or 'unknown',
+                                          {'total': 0, 'changed': 0, 'issues': 0, 'score': 0.0})
+        stats['total'] += 1
+        stats['changed'] += detail['changed']
+        stats['issues'] += detail['issues_found']
+        stats['score'] += detail['formatting_score']
+
+    for language, stats in sorted(language_stats.items()):
+        report['language_breakdown'][language] = {
+            'total_files': stats['total'],
+            'changed_files': stats['changed'],
+            'issues_found': stats['issues'],
+            'average_formatting_score': stats['score'] / stats['total'],
+        }
+    return report
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import time
+
+from utils.fileio import AtomicFile, line_ending, sync_directories
+
+from . import get_logger, registry
+from .batch import source_extensions
+from .edits import apply_edits
+from .formatter import DEFAULT_MAX_ITERATIONS
+
+logger = get_logger(__name__)
+
+# Seconds between two scans of the tree
+POLL_INTERVAL = 0.5
+# Seconds without a new change before the changed files are formatted
+DEBOUNCE = 0.3
+
+def scan(root, extensions):
+    """{path: (mtime_ns, size)} for the files under root with one of extensions
+
+    Hidden directories are skipped, like collect_files does, and symlinked
+    directories are not followed.
+    """
+    found = {}
+    directories = [root]
+    while directories:
+        try:
+            entries = os.scandir(directories.pop())
+        except OSError:
+            continue  # removed or unreadable since it was listed
+        with entries:
+            for entry in entries:
+                name = entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    if not name.startswith('.'):
+                        directories.append(entry.path)
+                    continue
+                # os.path.splitext's answer, without its cost on every file of the tree
+                dot = name.rfind('.')
+                if dot > 0 and name[dot:].lower() in extensions:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    found[entry.path] = (stat.st_mtime_ns, stat.st_size)
+    return found
+
+class FileIndex:
+    """path -> (mtime_ns, size, content hash) of the source files under root
+
+    changed() rescans with os.scandir and only reads the files whose mtime
+    or size moved; of those it reports the ones whose content hash moved
+    too, so touching a file or saving it unmodified is not a change.
+    """
+
+    def __init__(self, root, extensions):
+        self.root = root
+        self.extensions = extensions
+        self.entries = {}
+        self.changed()  # everything is new the first time; nothing to report
+
+    def __len__(self):
+        return len(self.entries)
+
+    def changed(self):
+        """Paths added or modified since the last call; deleted files are forgotten"""
+        current = scan(self.root, self.extensions)
+        for path in self.entries.keys() - current.keys():
+            del self.entries[path]
+
+        changed = []
+        for path, stamp in current.items():
+            entry = self.entries.get(path)
+            if entry is not None and entry[:2] == stamp:
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            except OSError:
+                continue  # deleted since the scan
+            self.entries[path] = stamp + (digest,)
+            if entry is None or entry[2] != digest:
+                changed.append(path)
+        return sorted(changed)
+
+    def record(self, path, stat, content):
+        """Take content written to path, whose os.stat() is stat, as already seen"""
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        self.entries[path] = (stat.st_mtime_ns, stat.st_size, digest)
+
+class Watcher:
+    """Reformat the source files under root as they change
+
+    The tree is polled through a FileIndex; changed files are collected
+    until a poll finds nothing new for debounce seconds (editors often
+    save in several writes) and then formatted, each once. Formatters
+    come from the process-wide registry, so they and their compiled
+    patterns stay warm from one change to the next. With in_place=True
+    files that change are rewritten, and the rewrite itself is not seen
+    as a change.
+
+        watcher = Watcher('src', in_place=True)
+        watcher.run(lambda path, result: print(path, len(result['edits'])))
+    """
+
+    def __init__(self, root, language=None, style='google', engine='patch', converge=False,
+                 max_iterations=DEFAULT_MAX_ITERATIONS, in_place=False, durable=False,
+                 interval=POLL_INTERVAL, debounce=DEBOUNCE):
+        self.language = language
+        self.style = style
+        self.engine = engine
+        self.converge = converge
+        self.max_iterations = max_iterations
+        self.in_place = in_place
+        self.durable = durable
+        self.interval = interval
+        self.debounce = debounce
+        self.index = FileIndex(root, source_extensions(language))
+        self.pending = set()
+        self.last_change = None
+
+    def run(self, report):
+        """Poll until interrupted, calling report(path, result) for every file formatted"""
+        while True:
+            for path, result in self.poll():
+                report(path, result)
+            time.sleep(self.interval)
+
+    def poll(self):
+        """Scan once; [(path, result)] for the files formatted, if the debounce window is over"""
+        changed = self.index.changed()
+        now = time.monotonic()
+        if changed:
+            self.pending.update(changed)
+            self.last_change = now
+            return []
+        if not self.pending or now - self.last_change < self.debounce:
+            return []
+
+        paths, self.pending = sorted(self.pending), set()
+        results = []
+        for path in paths:
+            try:
+                results.append((path, self.format(path)))
+            except (OSError, UnicodeDecodeError) as e:
+                logger.warning("❌ %s: %s", path, e)
+        return results
+
+    def format(self, path):
+        """Format one file: format_source_edits' result plus 'written'
+
+        A file that changes between the read and the rewrite is not
+        written; it goes back to pending instead.
+        """
+        language = self.language or registry.get_language_manager().detect_language(path)
+        formatter = registry.get_formatter(language, self.style, self.engine)
+        with open(path, 'r') as f:
+            original_code = f.read()
+            newline = line_ending(f)
+            stat = os.fstat(f.fileno())
+        read = (stat.st_mtime_ns, stat.st_size)
+        result = formatter.format_source_edits(original_code, self.converge, self.max_iterations)
+        result['written'] = bool(self.in_place and result['edits'])
+        if result['written']:
+            formatted_code = apply_edits(original_code, result['edits'])
+            with AtomicFile(path, self.durable, newline=newline) as f:
+                f.write(formatted_code)
+                stat = os.stat(path)
+                if (stat.st_mtime_ns, stat.st_size) != read:
+                    # Saved again while it was being formatted: the temp file
+                    # is dropped and the new content waits for the next round
+                    self.pending.add(path)
+                    self.last_change = time.monotonic()
+                    result['written'] = False
+                    return result
+                stat = f.commit()
+            if self.durable:
+                sync_directories([path])
+            # The index hashes the file's bytes, line endings included
+            if newline is not None:
+                formatted_code = formatted_code.replace('\n', newline)
+            self.index.record(path, stat, formatted_code)
+        return result
@@ -5,63 +5,221 @@ import sys
 # Add the current directory to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-try:
-    from core.formatter import CodeFormatter
-    from core.language_manager import LanguageManager
-except ImportError as e:
-    print(f"❌ Import error: {e}")
-    print("🔧 Creating minimal formatter...")
-    
-    # Fallback minimal formatter
-    class MinimalFormatter:
-        def __init__(self, language='java'):
-            self.language = language
-            
-        def format_file(self, file_path):
-            with open(file_path, 'r') as f:
-                code = f.read()
+# Single files larger than this are streamed without --stream where that changes nothing but memory
+STREAM_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+# Fallback minimal formatter
+class MinimalFormatter:
+    def __init__(self, language='java', engine='patch'):
+        self.language = language
+        
+    def format_file(self, file_path):
+        with open(file_path, 'r') as f:
+            return self.format_source(f.read())
+    
+    def format_source(self, code, converge=False, max_iterations=10):
+        # Simple formatting for demo
+        if self.language == 'java':
+            formatted = code.replace('){', ') {').replace('for(', 'for (')
+        else:
+            formatted = code
             
-            # Simple formatting for demo
-            if self.language == 'java':
-                formatted = code.replace('){', ') {').replace('for(', 'for (')
-            else:
-                formatted = code
-                
-            return {
-                'original_code': code,
-                'formatted_code': formatted,
-                'issues_found': [],
-                'formatting_score': 50.0,
-                'fixes_applied': 0
-            }
-    
-    CodeFormatter = MinimalFormatter
+        return {
+            'original_code': code,
+            'formatted_code': formatted,
+            'issues_found': [],
+            'formatting_score': 50.0,
+            'fixes_applied': 0
+        }
+
+def get_minimal_formatter(language='java', style='google', engine='patch'):
+    return MinimalFormatter(language)
+
+def import_formatter():
+    """(CodeFormatter, get_formatter), or the minimal fallback if core cannot be imported
+    
+    Imported here rather than at the top so that --help and usage errors
+    do not pay for loading the formatter.
+    """
+    try:
+        from core.formatter import CodeFormatter
+        from core.registry import get_formatter
+    except ImportError as e:
+        print(f"❌ Import error: {e}", file=sys.stderr)
+        print("🔧 Creating minimal formatter...", file=sys.stderr)
+        return MinimalFormatter, get_minimal_formatter
+    return CodeFormatter, get_formatter
+
+def help_formatter(prog):
+    """argparse's HelpFormatter at the terminal's width, found as shutil would without importing it
+
+    argparse builds a formatter for every add_argument, and left to size
+    itself each one imports shutil (and with it bz2 and lzma), ~4 ms on
+    every cold start.
+    """
+    try:
+        columns = int(os.environ.get('COLUMNS', 0))
+    except ValueError:
+        columns = 0
+    if columns <= 0:
+        try:
+            columns = os.get_terminal_size(sys.__stdout__.fileno()).columns
+        except (AttributeError, ValueError, OSError):
+            columns = 0
+    return argparse.HelpFormatter(prog, width=(columns or 80) - 2)
+
+def line_range(text):
+    """argparse type for --lines"""
+    from core.ranges import parse_line_range
+    try:
+        return parse_line_range(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def shard(text):
+    """argparse type for --shard"""
+    from core.batch import parse_shard
+    try:
+        parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return text
 
 def main():
-    parser = argparse.ArgumentParser(description='Universal Code Formatter')
-    parser.add_argument('--input', type=str, required=True, help='Input code file')
+    if sys.argv[1:2] == ['merge-reports']:
+        return run_merge_reports(sys.argv[2:])
+    
+    parser = argparse.ArgumentParser(description='Universal Code Formatter',
+                                     epilog='Run "%(prog)s merge-reports --help" to combine --report files '
+                                            'of sharded runs',
+                                     formatter_class=help_formatter)
+    parser.add_argument('--input', type=str, nargs='+',
+                       help="Input code file, or any number of files, directories and glob patterns; '-' reads stdin")
+    parser.add_argument('--stdin-filename', type=str, metavar='NAME',
+                       help='File name of the code piped to --input -, for language detection and diff labels '
+                            '(implies --input -)')
     parser.add_argument('--output', type=str, help='Output file for formatted code')
+    parser.add_argument('--in-place', '-i', action='store_true',
+                       help='Rewrite each input file that changes, atomically, keeping its line endings (a file '
+                            'mixing several gets \\n); unchanged files are not touched')
+    parser.add_argument('--durable', action='store_true',
+                       help='With --in-place, fsync rewritten files and, once each, their directories')
     parser.add_argument('--language', type=str, choices=['java', 'python', 'cpp', 'auto'], 
                        default='auto', help='Programming language')
+    parser.add_argument('--engine', type=str, choices=['patch', 'printer'], default='patch',
+                       help='Formatting engine: detect-and-patch issues, or reprint the token stream')
+    parser.add_argument('--lines', type=line_range, action='append', metavar='START-END',
+                       help='Only format these lines (1-based, inclusive), widened to whole statements; '
+                            'may be repeated')
+    parser.add_argument('--stream', action='store_true',
+                       help='Format a single file a chunk at a time and write the code as it goes, in bounded '
+                            'memory (automatic above 64 MB with --engine printer and --output, --check or --in-place)')
+    parser.add_argument('--converge', action='store_true',
+                       help='Re-run formatting on its own output until it stops changing')
+    parser.add_argument('--max-iterations', type=int, default=10,
+                       help='Iteration cap for --converge')
+    parser.add_argument('--check', action='store_true',
+                       help='Only report through the exit code: 0 if already formatted, 1 if not, 2 on error')
+    parser.add_argument('--diff', action='store_true',
+                       help='Print a unified diff of the changes instead of both versions')
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                       help='Show formatter diagnostics on stderr (-v progress, -vv details)')
+    parser.add_argument('--jobs', '-j', type=int, default=0,
+                       help='Worker processes for directories and globs (default: one per CPU)')
+    parser.add_argument('--cache-dir', type=str,
+                       help='Reuse results for unchanged content from this on-disk cache')
+    parser.add_argument('--cache-max-bytes', type=int, default=256 * 1024 * 1024,
+                       help='Size cap of --cache-dir; least recently used entries are evicted')
+    parser.add_argument('--changed-since', type=str, metavar='REF',
+                       help='Format the files whose working tree copy differs from git REF '
+                            '(--input, if given, narrows them down like git pathspecs)')
+    parser.add_argument('--staged', action='store_true',
+                       help='Format the staged content of the files staged for commit')
+    parser.add_argument('--serve', type=str, metavar='SOCKET',
+                       help='Run as a daemon answering JSON-lines requests on this Unix socket (see client.py)')
+    parser.add_argument('--watch', type=str, metavar='DIR',
+                       help='Keep running and reformat the files under DIR as they change '
+                            '(report only, unless --in-place)')
+    parser.add_argument('--shard', type=shard, metavar='K/N',
+                       help='Only format the K-th of N shards of the input files, split by a stable hash '
+                            'of each path (for spreading a run across CI nodes)')
+    parser.add_argument('--report', type=str, metavar='FILE',
+                       help='Write a JSON report of the results (per file and summary) to FILE')
     
     args = parser.parse_args()
+    if args.stdin_filename and not args.input:
+        args.input = ['-']
+    git_mode = args.changed_since or args.staged
+    if not args.input and not args.serve and not git_mode and not args.watch:
+        parser.error('one of --input, --changed-since, --staged, --serve or --watch is required')
+    if args.watch and (args.input or git_mode or args.serve or args.output or args.check or args.diff or
+                       args.lines or args.stream):
+        parser.error('--watch cannot be combined with --input, --changed-since, --staged, --serve, '
+                     '--output, --check, --diff, --lines or --stream')
+    if args.changed_since and args.staged:
+        parser.error('--changed-since and --staged cannot be combined')
+    if args.input and '-' in args.input and len(args.input) > 1:
+        parser.error("--input - reads stdin and cannot be combined with other inputs")
+    if args.stdin_filename and args.input != ['-']:
+        parser.error('--stdin-filename only applies to --input -')
+    if args.lines and (git_mode or args.serve or len(args.input) > 1 or
+                       (args.input != ['-'] and not os.path.isfile(args.input[0]))):
+        parser.error('--lines applies to a single input file or --input -')
+    if args.stream and (args.lines or args.diff or git_mode or args.serve or len(args.input) > 1 or
+                        not os.path.isfile(args.input[0])):
+        parser.error('--stream applies to a single input file, without --lines or --diff')
+    if args.in_place and (args.output or args.check or args.diff or args.staged or args.serve or
+                          args.input == ['-']):
+        parser.error('--in-place cannot be combined with --output, --check, --diff, --staged, --serve or --input -')
+    if args.durable and not args.in_place:
+        parser.error('--durable only applies to --in-place')
+    if (args.shard or args.report) and (args.serve or args.watch or args.input == ['-']):
+        parser.error('--shard and --report cannot be combined with --serve, --watch or --input -')
+    
+    configure_logging(args.verbose)
+    
+    if args.serve:
+        return run_daemon(args)
+    if args.watch:
+        return run_watch(args)
+    if git_mode:
+        return run_git(args)
     
-    if not os.path.exists(args.input):
-        print(f"❌ Error: File '{args.input}' not found")
-        return
+    if args.input == ['-']:
+        return run_stdin(args)
+    if len(args.input) > 1 or not os.path.isfile(args.input[0]) or args.shard or args.report:
+        return run_batch(args)
+    args.input = args.input[0]
+    
+    from utils.fileio import is_archive
+    if is_archive(args.input):
+        return run_archive(args)
+    if args.stream or auto_stream(args):
+        return run_stream(args)
+    if args.in_place:
+        return run_in_place(args)
+    if args.check or args.diff:
+        return check_or_diff(args)
     
     # Auto-detect language
     if args.language == 'auto':
+        from core.language_manager import LanguageManager
         lm = LanguageManager()
         args.language = lm.detect_language(args.input)
         print(f"🔍 Auto-detected language: {args.language}")
     
+    CodeFormatter, get_formatter = import_formatter()
     try:
         # Initialize formatter
-        formatter = CodeFormatter(language=args.language)
+        formatter = CodeFormatter(language=args.language, engine=args.engine, cache=open_cache(args))
         
         # Format the code
-        result = formatter.format_file(args.input)
+        if args.lines:
+            result = format_lines(formatter, args)
+        elif args.converge:
+            result = formatter.format_file(args.input, converge=True, max_iterations=args.max_iterations)
+        else:
+            result = formatter.format_file(args.input)
         
         # Save formatted code
         if args.output:
@@ -73,6 +231,11 @@ def main():
         print(f"\n✅ {args.language.upper()} Formatting complete!")
         print(f"📊 Found {len(result['issues_found'])} issues, fixed {result['fixes_applied']}")
         print(f"💯 Formatting score: {result['formatting_score']:.1f}%")
+        if 'iterations' in result:
+            if result['converged']:
+                print(f"🔁 Converged after {result['iterations']} iteration(s)")
+            else:
+                print(f"⚠️  Did not converge within {result['iterations']} iterations")
         
         # Show changes
         if result['original_code'] != result['formatted_code']:
@@ -88,8 +251,8 @@ def main():
         print(f"❌ Error during formatting: {e}")
         print("🔄 Using fallback formatter...")
         
-        # Use minimal formatter as fallback
-        formatter = CodeFormatter(args.language)
+        # Use minimal formatter as fallback; the shared one is already warm
+        formatter = get_formatter(args.language)
         result = formatter.format_file(args.input)
         
         if args.output:
@@ -97,5 +260,512 @@ def main():
                 f.write(result['formatted_code'])
             print(f"💾 Formatted code saved to: {args.output}")
 
+def configure_logging(verbose):
+    """Log to stderr, more with each -v; without -v logging is only imported once a warning comes"""
+    def configure():
+        import logging
+        logging.basicConfig(level=max(logging.DEBUG, logging.WARNING - 10 * verbose),
+                            format='%(message)s', stream=sys.stderr)
+    if verbose:
+        configure()
+    else:
+        from core import WARNING, configure_logging_on_demand
+        configure_logging_on_demand(WARNING, configure)
+
+def format_lines(formatter, args):
+    """--lines on a single file, as a format_file-shaped result"""
+    from core.edits import apply_edits
+    
+    with open(args.input, 'r') as f:
+        original_code = f.read()
+    result = formatter.format_source_lines(original_code, args.lines, converge=args.converge,
+                                           max_iterations=args.max_iterations)
+    result['original_code'] = original_code
+    result['formatted_code'] = apply_edits(original_code, result['edits'])
+    return result
+
+def auto_stream(args):
+    """Whether a file too large to hold is streamed without --stream, saying so either way
+
+    Only the printer engine formats a stream exactly as the whole file, and
+    only with --output, --check or --in-place does the report stay where it
+    would be, so anything else is formatted whole as asked.
+    """
+    size = os.path.getsize(args.input)
+    if args.lines or args.diff or size <= STREAM_THRESHOLD_BYTES:
+        return False
+    if args.engine == 'printer' and (args.output or args.check or args.in_place):
+        print(f"🌊 {args.input} is {size / 1024 / 1024:.0f} MB, formatting it with --stream", file=sys.stderr)
+        return True
+    print(f"⚠️  {args.input} is {size / 1024 / 1024:.0f} MB and is formatted whole; "
+          f"--stream formats it in bounded memory", file=sys.stderr)
+    return False
+
+def run_stream(args):
+    """--stream, and single files too large to hold: format in chunks straight to the output"""
+    CodeFormatter, _ = import_formatter()
+    if args.output and os.path.exists(args.output) and os.path.samefile(args.input, args.output):
+        print("❌ --stream cannot write over its own input; choose another --output", file=sys.stderr)
+        return 2
+    # The code goes to stdout unless there is an --output, so the report goes to stderr
+    report = sys.stdout if args.output or args.check or args.in_place else sys.stderr
+    try:
+        if args.language == 'auto':
+            from core.language_manager import LanguageManager
+            args.language = LanguageManager().detect_language(args.input)
+        
+        formatter = CodeFormatter(language=args.language, engine=args.engine)
+        options = {'converge': args.converge, 'max_iterations': args.max_iterations}
+        if args.check:
+            totals = formatter.format_large_file(args.input, **options)
+        elif args.in_place:
+            from utils.fileio import AtomicFile, line_ending, sync_directories
+            # Too large to read whole for this: the first line's ending stands for the file's
+            with open(args.input, 'r') as f:
+                f.readline()
+                newline = line_ending(f)
+            with AtomicFile(args.input, args.durable, newline=newline) as output:
+                totals = formatter.format_large_file(args.input, output, **options)
+                if totals['changed']:
+                    output.commit()
+            if totals['changed'] and args.durable:
+                sync_directories([args.input])
+        elif args.output:
+            with open(args.output, 'w') as output:
+                totals = formatter.format_large_file(args.input, output, **options)
+        else:
+            totals = formatter.format_large_file(args.input, sys.stdout, **options)
+    except Exception as e:
+        print(f"❌ Error during formatting: {e}", file=sys.stderr)
+        return 2
+    
+    if args.check:
+        return 1 if totals['changed'] else 0
+    if args.output:
+        print(f"💾 Formatted code saved to: {args.output}", file=report)
+    elif args.in_place and totals['changed']:
+        print(f"💾 Rewrote {args.input}", file=report)
+    print(f"\n✅ {args.language.upper()} Formatting complete! "
+          f"({totals['bytes_in'] / 1024 / 1024:.1f} MB in {totals['chunks']} chunks)", file=report)
+    print(f"📊 Found {totals['issues']} issues, fixed {totals['fixes_applied']}", file=report)
+    print(f"💯 Formatting score: {totals['formatting_score']:.1f}%", file=report)
+    if not totals['changed']:
+        print("🎉 Code is already perfectly formatted!", file=report)
+    return 0
+
+def run_archive(args):
+    """A zip or tar --input: format its source members into a new archive, extracting nothing to disk
+    
+    The new archive goes to --output, or replaces the input with --in-place
+    (only if a member changed); with neither, members are only reported.
+    """
+    import contextlib
+    from core.archive import ArchiveFormatter
+    from core.edits import unified_diff_from_edits
+    from utils.fileio import AtomicFile, sync_directories
+    
+    if args.lines or args.stream:
+        print("❌ Error: --lines and --stream do not apply to archives", file=sys.stderr)
+        return 2
+    if args.output and os.path.exists(args.output) and os.path.samefile(args.input, args.output):
+        print("❌ Error: use --in-place to rewrite an archive, not --output", file=sys.stderr)
+        return 2
+    
+    language = None if args.language == 'auto' else args.language
+    archive = ArchiveFormatter(language, engine=args.engine, converge=args.converge,
+                               max_iterations=args.max_iterations)
+    members = changed = failed = 0
+    try:
+        with contextlib.ExitStack() as stack:
+            output = None
+            if args.in_place:
+                rewrite = stack.enter_context(AtomicFile(args.input, args.durable, binary=True))
+                output = rewrite.file
+            elif args.output and not (args.check or args.diff):
+                output = stack.enter_context(open(args.output, 'wb'))
+            
+            for name, original_code, result in archive.format(args.input, output):
+                edits = result['edits']
+                members += 1
+                changed += bool(edits)
+                label = f"{args.input}/{name}"
+                if 'error' in result:
+                    # Copied as it is; the run still fails
+                    failed += 1
+                    print(f"❌ {label}: {result['error']}", file=sys.stderr)
+                    continue
+                if args.check:
+                    continue
+                if args.diff:
+                    if edits:
+                        sys.stdout.writelines(unified_diff_from_edits(original_code, edits, label,
+                                                                      label + ' (formatted)'))
+                    continue
+                status = ("💾" if args.in_place or args.output else "📝") if edits else "🎉"
+                print(f"{status} {label}: {len(result['issues_found'])} issues, fixed {result['fixes_applied']}")
+            if args.in_place and changed:
+                rewrite.commit()
+        if args.in_place and changed and args.durable:
+            sync_directories([args.input])
+    except Exception as e:
+        print(f"❌ Error during formatting: {e}", file=sys.stderr)
+        return 2
+    
+    if failed:
+        print(f"❌ {failed} of {members} source files in {args.input} could not be formatted", file=sys.stderr)
+        return 2
+    if args.check:
+        return 1 if changed else 0
+    if not args.diff:
+        if args.output:
+            print(f"💾 Formatted archive saved to: {args.output}")
+        print(f"\n✅ Processed {members} source files in {args.input}, {changed} "
+              f"{'rewritten' if args.in_place else 'changed' if args.output else 'would change'}")
+    return 0
+
+def run_in_place(args):
+    """--in-place on a single file: rewrite it if, and only if, formatting changes it"""
+    from core.edits import apply_edits
+    from utils.fileio import AtomicFile, line_ending, sync_directories
+    
+    CodeFormatter, _ = import_formatter()
+    try:
+        if args.language == 'auto':
+            from core.language_manager import LanguageManager
+            args.language = LanguageManager().detect_language(args.input)
+        
+        formatter = CodeFormatter(language=args.language, engine=args.engine, cache=open_cache(args))
+        with open(args.input, 'r') as f:
+            original_code = f.read()
+            newline = line_ending(f)
+        if args.lines:
+            result = formatter.format_source_lines(original_code, args.lines, converge=args.converge,
+                                                   max_iterations=args.max_iterations)
+        else:
+            result = formatter.format_source_edits(original_code, converge=args.converge,
+                                                   max_iterations=args.max_iterations)
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        if result['edits']:
+            with AtomicFile(args.input, args.durable, newline=newline) as f:
+                f.write(apply_edits(original_code, result['edits']))
+                f.commit()
+            if args.durable:
+                sync_directories([args.input])
+    except Exception as e:
+        print(f"❌ Error during formatting: {e}", file=sys.stderr)
+        return 2
+    
+    if result['edits']:
+        print(f"💾 Rewrote {args.input}: {len(result['issues_found'])} issues, fixed {result['fixes_applied']}")
+    else:
+        print(f"🎉 {args.input} is already formatted, left untouched")
+    return 0
+
+def run_daemon(args):
+    """--serve: answer requests from client.py until interrupted"""
+    import signal
+    from core.daemon import FormatterDaemon
+    
+    try:
+        server = FormatterDaemon(args.serve, engine=args.engine)
+    except OSError as e:
+        print(f"❌ Error: Cannot serve on {args.serve}: {e}", file=sys.stderr)
+        return 2
+    
+    print(f"🛰️  Formatter daemon listening on {args.serve} (Ctrl+C to stop)", file=sys.stderr)
+    # Stop on SIGTERM the same way as on Ctrl+C, so the socket file is removed
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+def run_watch(args):
+    """--watch DIR: reformat the files under DIR as they change, until interrupted"""
+    import signal
+    from core.watch import Watcher
+    
+    if not os.path.isdir(args.watch):
+        print(f"❌ Error: {args.watch} is not a directory", file=sys.stderr)
+        return 2
+    
+    language = None if args.language == 'auto' else args.language
+    watcher = Watcher(args.watch, language=language, engine=args.engine, converge=args.converge,
+                      max_iterations=args.max_iterations, in_place=args.in_place, durable=args.durable)
+    print(f"👀 Watching {len(watcher.index)} files under {args.watch} (Ctrl+C to stop)", flush=True)
+    
+    def report(path, result):
+        if 'error' in result:
+            print(f"❌ {path}: {result['error']}", file=sys.stderr, flush=True)
+            return
+        status = ("💾" if result['written'] else "📝") if result['edits'] else "🎉"
+        print(f"{status} {path}: {len(result['issues_found'])} issues, fixed {result['fixes_applied']}", flush=True)
+    
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        watcher.run(report)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def open_cache(args):
+    """ResultCache for --cache-dir, or None"""
+    if not args.cache_dir:
+        return None
+    from core.cache import ResultCache
+    return ResultCache(args.cache_dir, args.cache_max_bytes)
+
+def run_batch(args):
+    """Directories, globs and multiple files: format them all across a process pool"""
+    import time
+    from core.batch import BatchFormatter, collect_files
+    
+    if args.output:
+        print("❌ Error: --output takes a single input file", file=sys.stderr)
+        return 2
+    
+    language = None if args.language == 'auto' else args.language
+    paths = collect_files(args.input, language)
+    if not paths:
+        print(f"❌ Error: No source files found in {' '.join(args.input)}", file=sys.stderr)
+        return 2
+    paths = select_shard(args, paths)
+    
+    start_time = time.perf_counter()
+    batch = BatchFormatter(jobs=args.jobs, language=language, engine=args.engine, converge=args.converge,
+                           max_iterations=args.max_iterations, edits=True,
+                           cache_dir=args.cache_dir, cache_max_bytes=args.cache_max_bytes,
+                           in_place=args.in_place, durable=args.durable)
+    results = batch.format_paths(paths)
+    return report_batch(args, results, wall_time=time.perf_counter() - start_time)
+
+def select_shard(args, paths):
+    """The paths of this run's --shard, all of them without one"""
+    if not args.shard:
+        return paths
+    from core.batch import parse_shard, shard_paths
+    selected = shard_paths(paths, *parse_shard(args.shard))
+    print(f"🧩 Shard {args.shard}: {len(selected)} of {len(paths)} files")
+    return selected
+
+def run_git(args):
+    """--changed-since / --staged: format only what git reports as changed
+    
+    Staged content is read from the index through one `git cat-file --batch`
+    process and formatted in memory; the working tree is never touched.
+    """
+    import time
+    from core.batch import BatchFormatter, _error_result, source_extensions
+    from core.gitfiles import BlobReader, changed_files
+    
+    if args.output:
+        print("❌ Error: --output takes a single input file", file=sys.stderr)
+        return 2
+    
+    language = None if args.language == 'auto' else args.language
+    extensions = source_extensions(language)
+    start_time = time.perf_counter()
+    batch = BatchFormatter(jobs=args.jobs, language=language, engine=args.engine, converge=args.converge,
+                           max_iterations=args.max_iterations, edits=True,
+                           cache_dir=args.cache_dir, cache_max_bytes=args.cache_max_bytes,
+                           in_place=args.in_place, durable=args.durable)
+    try:
+        paths = select_shard(args, [path for path in changed_files(args.changed_since, args.staged, args.input)
+                                    if os.path.splitext(path)[1].lower() in extensions])
+        if not args.staged:
+            results = batch.format_paths(paths)
+            return report_batch(args, results, wall_time=time.perf_counter() - start_time)
+        sources, unreadable = {}, []
+        with BlobReader() as reader:
+            for path in paths:
+                try:
+                    sources[path] = reader.read_staged(path)
+                except UnicodeDecodeError as e:
+                    # One file that is not UTF-8 fails alone, as it would on disk
+                    unreadable.append((path, _error_result(e, batch.options)))
+    except OSError as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        return 2
+    results = sorted(batch.format_sources(sources.items()) + unreadable, key=lambda item: item[0])
+    return report_batch(args, results, sources, wall_time=time.perf_counter() - start_time)
+
+def report_batch(args, results, sources=None, wall_time=None):
+    """Print the results of a batch run; sources holds the code that was not read from disk"""
+    from core.edits import unified_diff_from_edits
+    
+    if args.report:
+        write_report(args.report, args.shard, results, wall_time)
+    
+    changed = failed = 0
+    for path, result in results:
+        if 'error' in result:
+            failed += 1
+            print(f"❌ {path}: {result['error']}", file=sys.stderr)
+            continue
+        edits = result['edits']
+        changed += bool(edits)
+        if args.check:
+            continue
+        if args.diff:
+            if edits:
+                if sources is not None:
+                    original_code = sources[path]
+                else:
+                    with open(path, 'r') as f:
+                        original_code = f.read()
+                sys.stdout.writelines(unified_diff_from_edits(original_code, edits, path, path + ' (formatted)'))
+            continue
+        status = ("💾" if args.in_place else "📝") if edits else "🎉"
+        print(f"{status} {path}: {len(result['issues_found'])} issues, fixed {result['fixes_applied']}")
+    
+    if not (args.check or args.diff):
+        print(f"\n✅ Processed {len(results)} files, {changed} {'rewritten' if args.in_place else 'would change'}")
+    if failed:
+        print(f"❌ {failed} of {len(results)} files could not be formatted", file=sys.stderr)
+        return 2
+    if args.check:
+        return 1 if changed else 0
+    return 0
+
+def write_report(path, shard, results, wall_time):
+    """--report: the JSON report of a batch run"""
+    import json
+    from core.reports import build_report
+    
+    with open(path, 'w') as f:
+        json.dump(build_report(results, shard, wall_time), f, indent=2)
+
+def run_merge_reports(argv):
+    """merge-reports: combine the --report files of sharded runs into one report"""
+    import json
+    from core.reports import merge_reports, missing_shards
+    
+    parser = argparse.ArgumentParser(prog='main.py merge-reports',
+                                     description='Combine the --report files of sharded runs into one report',
+                                     formatter_class=help_formatter)
+    parser.add_argument('reports', nargs='+', metavar='REPORT', help='--report files to merge')
+    parser.add_argument('--output', type=str, help='Write the merged report here instead of stdout')
+    args = parser.parse_args(argv)
+    
+    try:
+        reports = []
+        for path in args.reports:
+            with open(path, 'r') as f:
+                reports.append(json.load(f))
+        report = merge_reports(reports)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Error: Cannot merge reports: {e}", file=sys.stderr)
+        return 2
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    
+    out = sys.stderr if not args.output else sys.stdout
+    print(f"🧩 Merged {len(reports)} reports: {report['total_files']} files, "
+          f"{report['changed_files']} would change", file=out)
+    print(f"📊 Found {report['total_issues']} issues, fixed {report['total_fixes']} "
+          f"({report['fix_success_rate']:.1f}%)", file=out)
+    print(f"💯 Average formatting score: {report['average_formatting_score']:.1f}%", file=out)
+    if report['failed_files']:
+        print(f"❌ {report['failed_files']} files could not be formatted", file=out)
+    if report['wall_time'] is not None:
+        print(f"⏱️  Slowest shard took {report['wall_time']:.2f}s; {report['total_processing_time']:.2f}s "
+              f"of formatting in all", file=out)
+    for language, stats in report['language_breakdown'].items():
+        print(f"   {language}: {stats['total_files']} files, {stats['issues_found']} issues, "
+              f"score {stats['average_formatting_score']:.1f}%", file=out)
+    missing = missing_shards(report)
+    if missing:
+        print(f"⚠️  Missing shards: {', '.join(missing)}", file=out)
+    return 0
+
+def run_stdin(args):
+    """--input -: format code piped in by an editor; stdout gets only the code, or the diff
+    
+    Diagnostics go to stderr, so the output can replace the editor buffer
+    as is. --check still reports through the exit code alone.
+    """
+    name = args.stdin_filename or '<stdin>'
+    if args.language == 'auto':
+        from core.language_manager import LanguageManager
+        args.language = LanguageManager().detect_language(args.stdin_filename)
+    
+    from core.edits import apply_edits
+    
+    CodeFormatter, _ = import_formatter()
+    try:
+        original_code = sys.stdin.read()
+        formatter = CodeFormatter(language=args.language, engine=args.engine, cache=open_cache(args))
+        if args.lines:
+            result = formatter.format_source_lines(original_code, args.lines, converge=args.converge,
+                                                   max_iterations=args.max_iterations)
+        elif args.check or args.diff:
+            result = formatter.format_source_edits(original_code, converge=args.converge,
+                                                   max_iterations=args.max_iterations)
+        else:
+            result = formatter.format_source(original_code, converge=args.converge,
+                                             max_iterations=args.max_iterations)
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        edits = result.get('edits')
+        if args.lines:
+            result['formatted_code'] = apply_edits(original_code, edits)
+    except Exception as e:
+        print(f"❌ Error during formatting: {e}", file=sys.stderr)
+        return 2
+    
+    if args.check or args.diff:
+        if args.diff and edits:
+            from core.edits import unified_diff_from_edits
+            sys.stdout.writelines(unified_diff_from_edits(original_code, edits, name, name + ' (formatted)'))
+        return 1 if args.check and edits else 0
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(result['formatted_code'])
+    else:
+        sys.stdout.write(result['formatted_code'])
+    return 0
+
+def check_or_diff(args):
+    """--check / --diff: work from the formatter's edit spans, never both full texts"""
+    CodeFormatter, _ = import_formatter()
+    try:
+        if args.language == 'auto':
+            from core.language_manager import LanguageManager
+            args.language = LanguageManager().detect_language(args.input)
+        
+        formatter = CodeFormatter(language=args.language, engine=args.engine, cache=open_cache(args))
+        if args.lines:
+            result = formatter.format_lines(args.input, args.lines, converge=args.converge,
+                                            max_iterations=args.max_iterations)
+        else:
+            result = formatter.format_edits(args.input, converge=args.converge,
+                                            max_iterations=args.max_iterations)
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+        edits = result['edits']
+        
+        if args.diff and edits:
+            from core.edits import unified_diff_from_edits
+            with open(args.input, 'r') as f:
+                original_code = f.read()
+            sys.stdout.writelines(unified_diff_from_edits(original_code, edits,
+                                                          args.input, args.input + ' (formatted)'))
+    except Exception as e:
+        print(f"❌ Error during formatting: {e}", file=sys.stderr)
+        return 2
+    
+    if args.check:
+        return 1 if edits else 0
+    return 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
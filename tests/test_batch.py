@@ -0,0 +1,63 @@
+import errno
+import os
+
+import pytest
+
+import core.batch
+from core.batch import SHARED_TEXT_BYTES, BatchFormatter, _share_result, _unshare_result, collect_files
+from core.language_manager import LanguageManager
+from utils.fileio import SharedText
+
+def test_dangling_symlink_fails_alone(tmp_path):
+    (tmp_path / 'A.java').write_text("class A{int x=1;}\n")
+    os.symlink(tmp_path / 'missing.java', tmp_path / 'B.java')
+    paths = collect_files([str(tmp_path)])
+    results = dict(BatchFormatter(jobs=1, edits=True).format_paths(paths))
+    assert 'error' in results[str(tmp_path / 'B.java')]
+    assert 'error' not in results[str(tmp_path / 'A.java')]
+    assert results[str(tmp_path / 'A.java')]['edits']
+
+def test_collected_files_are_detected_as_the_language_they_were_collected_for(tmp_path):
+    manager = LanguageManager()
+    for language in manager.get_supported_languages():
+        for extension in manager.get_file_extensions(language):
+            (tmp_path / f'{language}{extension}').write_text('')
+    paths = collect_files([str(tmp_path)])
+    assert len(paths) == sum(len(manager.get_file_extensions(language))
+                             for language in manager.get_supported_languages())
+    for path in paths:
+        assert manager.detect_language(path) == os.path.basename(path).split('.')[0]
+
+@pytest.fixture
+def shared_dir(tmp_path, monkeypatch):
+    monkeypatch.setitem(core.batch._worker_options, 'shared_dir', str(tmp_path))
+    return tmp_path
+
+def test_shared_result_round_trip_leaves_no_files(shared_dir):
+    code = 'x' * SHARED_TEXT_BYTES
+    result = {'original_code': code, 'formatted_code': code, 'edits': []}
+    shared = _share_result(result)
+    assert isinstance(shared['formatted_code'], SharedText)
+    assert shared['original_code'] is shared['formatted_code']  # parked once
+    assert len(os.listdir(shared_dir)) == 1
+    assert _unshare_result(shared) == result
+    assert os.listdir(shared_dir) == []
+
+def test_shared_result_keeps_the_text_when_shared_memory_is_full(shared_dir, monkeypatch):
+    class Full:
+        def __init__(self, fd, mode):
+            os.close(fd)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            pass
+
+        def write(self, data):
+            raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+    monkeypatch.setattr('utils.fileio.os.fdopen', Full)
+    result = {'formatted_code': 'x' * SHARED_TEXT_BYTES}
+    assert _share_result(result) == result
+    assert os.listdir(shared_dir) == []
@@ -0,0 +1,26 @@
+import errno
+import os
+
+from core.cache import ResultCache
+
+def read_only(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise OSError(errno.EROFS, os.strerror(errno.EROFS))
+
+    monkeypatch.setattr('core.cache.os.utime', refuse)
+    monkeypatch.setattr('core.cache.tempfile.mkstemp', refuse)
+
+def test_read_only_cache_still_hits(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path))
+    key = cache.key('class A{}', 'java')
+    cache.put(key, {'formatted_code': 'class A {}'})
+    read_only(monkeypatch)
+    assert cache.get(key) == {'formatted_code': 'class A {}'}
+    assert (cache.hits, cache.misses) == (1, 0)
+
+def test_read_only_cache_drops_writes(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path))
+    read_only(monkeypatch)
+    key = cache.key('class A{}', 'java')
+    cache.put(key, {'formatted_code': 'class A {}'})
+    assert cache.get(key) is None
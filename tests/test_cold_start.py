@@ -0,0 +1,8 @@
+from benchmark_suite import COLD_START_UNNEEDED, FormatterBenchmarkSuite
+
+def test_cold_check_imports_nothing_it_does_not_need(monkeypatch):
+    # Wall time depends on the machine; benchmark_suite.py holds it to COLD_START_BUDGET_MS
+    monkeypatch.setenv('PYTHONDONTWRITEBYTECODE', '1')
+    imports = FormatterBenchmarkSuite().cold_start_imports()
+    assert 'core.formatter' in imports
+    assert [name for name in COLD_START_UNNEEDED if name in imports] == []
@@ -0,0 +1,37 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from core import registry
+from core.daemon import FormatterDaemon
+
+@pytest.fixture
+def daemon(tmp_path):
+    server = FormatterDaemon(str(tmp_path / 'formatter.sock'))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+def request(daemon, **fields):
+    with socket.socket(socket.AF_UNIX) as client:
+        client.connect(daemon.socket_path)
+        client.sendall(json.dumps(fields).encode('utf-8') + b'\n')
+        with client.makefile('rb') as f:
+            return json.loads(f.readline())
+
+def test_unknown_language_is_rejected_without_caching_a_formatter(daemon):
+    formatters = len(registry._formatters)
+    response = request(daemon, op='format', source='int x=1;', language='cobol', id=7)
+    assert response['id'] == 7
+    assert not response['ok']
+    assert 'cobol' in response['error']
+    assert len(registry._formatters) == formatters
+
+def test_known_language_is_formatted(daemon):
+    response = request(daemon, op='format', source='class A{int x=1;}', language='java')
+    assert response['ok'] and response['changed']
@@ -0,0 +1,82 @@
+import difflib
+import os
+import re
+
+import pytest
+
+from core.edits import EditTracker, apply_edits, split_lines, unified_diff_from_edits
+from core.formatter import CodeFormatter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SOURCES = [
+    ('java', "public class A{\n    void m(int a,int b){\n        int x=a+b;\n        if(x>10){\n"
+             "            x=x*2;\n        }\n    }\n}\n"),
+    ('java', "class B {\n    int f() { return g(a,b); }\n\n    int h() { return g(c,d); }\n}\n"),
+    ('python', "def f(a,b):\n    x=a+b\n    if x>0:\n        return x\n    return -x\n"),
+    ('python', "if x>0:print('P')\nelse:print('N')\n"),
+    ('cpp', "int main(){\n    int x=1;\n    for(int i=0;i<3;i++){x+=i;}\n    return x;\n}\n"),
+]
+for name, language in (('input.java', 'java'), ('input.py', 'python'), ('input.cpp', 'cpp')):
+    with open(os.path.join(ROOT, 'examples', name)) as f:
+        SOURCES.append((language, f.read()))
+
+CASES = [(engine, language, code) for engine in ('patch', 'printer') for language, code in SOURCES]
+
+@pytest.mark.parametrize('engine,language,code', CASES)
+def test_edits_rebuild_formatted_code(engine, language, code):
+    formatter = CodeFormatter(language=language, engine=engine)
+    formatted = formatter.format_source(code)['formatted_code']
+    assert apply_edits(code, formatter.format_source_edits(code)['edits']) == formatted
+
+@pytest.mark.parametrize('engine,language,code', CASES)
+def test_edits_are_sorted_and_never_overlap(engine, language, code):
+    edits = CodeFormatter(language=language, engine=engine).format_source_edits(code)['edits']
+    position = 0
+    for start, end, _ in edits:
+        assert position <= start <= end <= len(code)
+        position = end
+
+@pytest.mark.parametrize('engine,language,code', CASES)
+def test_diff_matches_difflib(engine, language, code):
+    edits = CodeFormatter(language=language, engine=engine).format_source_edits(code)['edits']
+    formatted = apply_edits(code, edits)
+    expected = difflib.unified_diff(split_lines(code), split_lines(formatted), 'a.src', 'b.src')
+    # difflib leaves out the marker patch(1) needs after a last line without a newline
+    expected = [line if line.endswith('\n') else line + '\n\\ No newline at end of file\n' for line in expected]
+    assert unified_diff_from_edits(code, edits, 'a.src', 'b.src') == expected
+
+def test_split_lines_only_splits_on_newlines():
+    assert split_lines("a\x0cb\r\nc\u2028d\n\ne") == ["a\x0cb\r\n", "c\u2028d\n", "\n", "e"]
+    assert split_lines("a\n") == ["a\n"]
+    assert split_lines("") == []
+
+def test_diff_of_a_file_with_a_form_feed():
+    code = "int a;\n\x0c\nint b=1;\nint c;\n"
+    diff = unified_diff_from_edits(code, [(14, 15, ' = ')], 'a', 'b')
+    assert diff == ['--- a\n', '+++ b\n', '@@ -1,4 +1,4 @@\n', ' int a;\n', ' \x0c\n',
+                    '-int b=1;\n', '+int b = 1;\n', ' int c;\n']
+
+def test_diff_of_no_edits_is_empty():
+    assert unified_diff_from_edits("int x;\n", []) == []
+
+def test_diff_marks_missing_final_newline():
+    diff = unified_diff_from_edits("a\nb", [(2, 3, 'c')], 'a', 'b')
+    assert diff[-2:] == ['-b\n\\ No newline at end of file\n', '+c\n\\ No newline at end of file\n']
+
+def test_tracker_edits_replay_its_rewrites():
+    original = "int a=1;\nint  b=2;\n  int c=3;  \n"
+    tracker = EditTracker(original)
+    tracker.sub(r'\s*=\s*', ' = ')
+    tracker.replace('  ', ' ')
+    tracker.strip()
+    expected = re.sub(r'\s*=\s*', ' = ', original).replace('  ', ' ').strip()
+    assert tracker.text == expected
+    assert apply_edits(original, tracker.edits()) == expected
+
+def test_tracker_splice_and_replace_text():
+    tracker = EditTracker("abcdef")
+    tracker.splice([(1, 2, 'BB'), (4, 4, '-')])
+    assert tracker.text == "aBBcd-ef"
+    tracker.replace_text("aBBcd-eF")
+    assert apply_edits("abcdef", tracker.edits()) == "aBBcd-eF"
@@ -0,0 +1,15 @@
+from core.formatter import CodeFormatter
+
+def test_fixes_applied_counts_every_occurrence():
+    code = "class A {\n    void m() {\n" + "        g(a,b);\n" * 500 + "    }\n}\n"
+    result = CodeFormatter(language='java').format_source(code)
+    commas = [issue for issue in result['issues_found'] if issue['type'] == 'missing_space_after_comma']
+    assert len(commas) == 500
+    assert 'g(a,b)' not in result['formatted_code']
+    assert result['fixes_applied'] >= 500
+    assert result['fixes_applied'] <= len(result['issues_found'])
+
+def test_edits_result_counts_like_format_source():
+    code = "class A {\n    void m() {\n" + "        g(a,b);\n" * 20 + "    }\n}\n"
+    formatter = CodeFormatter(language='java')
+    assert formatter.format_source_edits(code)['fixes_applied'] == formatter.format_source(code)['fixes_applied']
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+import main
+
+def git(cwd, *command):
+    subprocess.run(['git', *command], cwd=cwd, check=True, stdout=subprocess.DEVNULL)
+
+def test_staged_file_that_is_not_utf8_fails_alone(tmp_path, monkeypatch, capsys):
+    git(tmp_path, 'init', '-q')
+    (tmp_path / 'A.java').write_bytes(b"class A{int x=1;}\n")
+    (tmp_path / 'B.java').write_bytes("class B{String s=\"café\";}\n".encode('latin-1'))
+    git(tmp_path, 'add', 'A.java', 'B.java')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--staged', '--jobs', '1'])
+    assert main.main() == 2
+    out, err = capsys.readouterr()
+    assert 'A.java: ' in out
+    assert 'B.java: ' in err and 'utf-8' in err
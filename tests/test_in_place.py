@@ -0,0 +1,68 @@
+import sys
+import zipfile
+
+import pytest
+
+import core.watch
+import main
+from core.watch import Watcher
+
+CRLF_CODE = b"class A {\r\n    int f(int a,int b){\r\n        return a+b;\r\n    }\r\n}\r\n"
+
+def run_main(monkeypatch, *argv):
+    monkeypatch.setattr(sys, 'argv', ['main.py', *argv])
+    return main.main()
+
+@pytest.mark.parametrize('flags', [[], ['--stream'], ['--lines', '3']])
+def test_in_place_keeps_crlf(tmp_path, monkeypatch, flags):
+    path = tmp_path / 'A.java'
+    path.write_bytes(CRLF_CODE)
+    assert not run_main(monkeypatch, '--input', str(path), '--in-place', '--engine', 'printer', *flags)
+    data = path.read_bytes()
+    assert data != CRLF_CODE
+    assert data.count(b'\n') == data.count(b'\r\n') > 1
+
+def test_in_place_batch_keeps_each_files_line_endings(tmp_path, monkeypatch):
+    (tmp_path / 'A.java').write_bytes(CRLF_CODE)
+    (tmp_path / 'B.java').write_bytes(CRLF_CODE.replace(b'\r\n', b'\n'))
+    assert not run_main(monkeypatch, '--input', str(tmp_path), '--in-place', '--engine', 'printer')
+    crlf, lf = (tmp_path / 'A.java').read_bytes(), (tmp_path / 'B.java').read_bytes()
+    assert crlf.count(b'\n') == crlf.count(b'\r\n') > 1
+    assert b'\r' not in lf
+    assert crlf.replace(b'\r\n', b'\n') == lf
+
+def test_in_place_archive_keeps_crlf(tmp_path, monkeypatch):
+    path = tmp_path / 'src.zip'
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('A.java', CRLF_CODE)
+    assert not run_main(monkeypatch, '--input', str(path), '--in-place', '--engine', 'printer')
+    with zipfile.ZipFile(path) as archive:
+        data = archive.read('A.java')
+    assert data != CRLF_CODE
+    assert data.count(b'\n') == data.count(b'\r\n') > 1
+
+def test_watch_rewrite_keeps_crlf_and_is_not_seen_as_a_change(tmp_path):
+    path = tmp_path / 'A.java'
+    path.write_bytes(CRLF_CODE)
+    watcher = Watcher(str(tmp_path), engine='printer', in_place=True)
+    assert watcher.format(str(path))['written']
+    data = path.read_bytes()
+    assert data.count(b'\n') == data.count(b'\r\n') > 1
+    assert watcher.index.changed() == []
+
+def test_watch_does_not_overwrite_a_save_made_while_formatting(tmp_path, monkeypatch):
+    path = tmp_path / 'A.java'
+    path.write_bytes(CRLF_CODE)
+    watcher = Watcher(str(tmp_path), engine='printer', in_place=True)
+    saved = b"class A {\n    int g;\n}\n"
+    original_apply_edits = core.watch.apply_edits
+
+    def apply_edits(code, edits):
+        path.write_bytes(saved)  # the editor saves again
+        return original_apply_edits(code, edits)
+
+    monkeypatch.setattr(core.watch, 'apply_edits', apply_edits)
+    assert not watcher.format(str(path))['written']
+    assert path.read_bytes() == saved
+    assert watcher.pending == {str(path)}
+    assert [p.name for p in tmp_path.iterdir()] == ['A.java']
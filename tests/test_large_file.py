@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+import main
+from benchmark_suite import STREAM_RSS_BUDGET_MB, FormatterBenchmarkSuite, write_large_java_file
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.parametrize('engine', ['patch', 'printer'])
+def test_stream_stays_in_memory_budget(tmp_path, engine):
+    # Formatted whole, 2 MB already takes more than the budget
+    path = tmp_path / 'Big.java'
+    write_large_java_file(path, 2)
+    command = [sys.executable, 'main.py', '--input', str(path), '--output', str(tmp_path / 'out.java'),
+               '--engine', engine, '--stream']
+    assert FormatterBenchmarkSuite()._peak_rss_mb(command, ROOT) <= STREAM_RSS_BUDGET_MB
+    assert os.path.getsize(tmp_path / 'out.java') > 0
+
+@pytest.mark.parametrize('engine, streamed', [('printer', True), ('patch', False)])
+def test_large_file_streams_only_when_nothing_but_memory_changes(tmp_path, monkeypatch, capsys, engine, streamed):
+    path = tmp_path / 'A.java'
+    path.write_text("class A{int x=1;}\n")
+    monkeypatch.setattr(main, 'STREAM_THRESHOLD_BYTES', 1)
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--input', str(path), '--output', str(tmp_path / 'out.java'),
+                                      '--engine', engine])
+    assert not main.main()
+    err = capsys.readouterr().err
+    assert ('formatting it with --stream' in err) == streamed
+    assert ('--stream formats it in bounded memory' in err) != streamed
@@ -0,0 +1,28 @@
+import json
+import os
+
+import pytest
+
+from core.formatter import CodeFormatter
+
+# The patch engine's output on every python_test_data.json case; a change that moves
+# any of it has to be deliberate: re-record with `python -m tests.test_python_test_data`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXPECTED = os.path.join(ROOT, 'tests', 'data', 'python_test_data_patch.json')
+
+def load_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+def format_case(case):
+    return CodeFormatter(language='python').format_source(case['input'])['formatted_code']
+
+@pytest.mark.parametrize('case', load_json(os.path.join(ROOT, 'python_test_data.json')), ids=lambda case: case['name'])
+def test_patch_engine_output_is_unchanged(case):
+    assert format_case(case) == load_json(EXPECTED)[case['input']]
+
+if __name__ == '__main__':
+    with open(EXPECTED, 'w') as f:
+        json.dump({case['input']: format_case(case) for case in load_json(os.path.join(ROOT, 'python_test_data.json'))},
+                  f, indent=1, sort_keys=True)
+        f.write('\n')
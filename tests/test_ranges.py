@@ -0,0 +1,88 @@
+import sys
+
+import pytest
+
+import main
+
+from core.edits import apply_edits
+from core.formatter import CodeFormatter
+from core.ranges import dedent, indent_lines, parse_line_range, statement_spans
+
+JAVA = """class A {
+    /*
+     * a,b=c;
+     */
+    int f(int a,
+          int b){
+        return a+b;
+    }
+    int g(){return 1;}
+}
+"""
+
+PYTHON = '''def f(a,b):
+    s = """
+    x=1,y=2
+    """
+    t = g(a,
+          b)
+    return a+b
+'''
+
+@pytest.mark.parametrize('text, expected', [('3-7', (3, 7)), ('5', (5, 5)), ('2-2', (2, 2))])
+def test_parse_line_range(text, expected):
+    assert parse_line_range(text) == expected
+
+@pytest.mark.parametrize('text', ['', 'a-b', '-3', '0-2', '5-3', '1-2-3'])
+def test_parse_line_range_rejects(text):
+    with pytest.raises(ValueError):
+        parse_line_range(text)
+
+@pytest.mark.parametrize('code, language, lines, expected', [
+    (JAVA, 'java', (7, 7), (7, 7)),
+    (JAVA, 'java', (6, 6), (5, 8)),   # the second line of a signature: the whole method
+    (JAVA, 'java', (3, 3), (2, 4)),   # inside a block comment: the whole comment
+    (JAVA, 'java', (4, 5), (2, 8)),
+    (PYTHON, 'python', (3, 3), (2, 4)),   # inside a triple-quoted string: the whole string
+    (PYTHON, 'python', (6, 6), (5, 6)),   # a continuation line: the whole call
+    (PYTHON, 'python', (7, 7), (7, 7)),
+])
+def test_statement_spans_widen_to_whole_statements(code, language, lines, expected):
+    [(start, end, first, last)] = statement_spans(code, [lines], language)
+    assert (first, last) == expected
+    lines = code.splitlines(keepends=True)
+    assert code[start:end] == ''.join(lines[first - 1:last])
+
+def test_statement_spans_merge_touching_ranges_and_skip_past_the_end():
+    assert [span[2:] for span in statement_spans(JAVA, [(6, 6), (9, 9), (50, 60)])] == [(5, 9)]
+    assert [span[2:] for span in statement_spans(JAVA, [(3, 3), (9, 9)])] == [(2, 4), (9, 9)]
+
+def test_dedent_and_indent_lines_round_trip():
+    text = "    a;\n\n      b;\n    c;"
+    indent, dedented = dedent(text)
+    assert (indent, dedented) == ('    ', "a;\n\n  b;\nc;")
+    assert indent_lines(dedented, indent) == text
+    assert dedent("a;\n  b;") == ('', "a;\n  b;")
+
+@pytest.mark.parametrize('engine', ['patch', 'printer'])
+def test_lines_outside_the_range_are_byte_identical(engine):
+    code = "class A {\n" + "".join(f"    int m{i}(int a,int b){{\n        return a+b;\n    }}\n" for i in range(6)) + "}\n"
+    result = CodeFormatter(language='java', engine=engine).format_source_lines(code, [(9, 9)])
+    assert result['lines'] == [(9, 9)]
+    formatted = apply_edits(code, result['edits']).splitlines(keepends=True)
+    original = code.splitlines(keepends=True)
+    assert formatted[:8] == original[:8]
+    assert formatted[9:] == original[9:]
+    assert formatted[8] == "        return a + b;\n"
+
+def test_cli_lines_leaves_the_rest_of_the_file_byte_identical(tmp_path, monkeypatch):
+    code = "class A {\n  int x=1;\n\tint y=2;   \n    int z=3;\n}"
+    path = tmp_path / 'A.java'
+    path.write_bytes(code.encode())
+    output = tmp_path / 'out.java'
+    monkeypatch.setattr(sys, 'argv', ['main.py', '--input', str(path), '--lines', '4', '--output', str(output)])
+    assert not main.main()
+    original = code.encode().splitlines(keepends=True)
+    formatted = output.read_bytes().splitlines(keepends=True)
+    assert formatted[:3] + formatted[4:] == original[:3] + original[4:]
+    assert formatted[3] == b"    int z = 3;\n"
@@ -0,0 +1,24 @@
+import pytest
+
+from core.formatter import CodeFormatter
+from utils.tokenizer import AdvancedTokenizer
+
+@pytest.mark.parametrize('language, code, literals', [
+    ('java', "char c = '\\'';\nString s = \"escaped \\\" quote,x\";\nString e = \"\";\n",
+     ["'\\''", '"escaped \\" quote,x"', '""']),
+    ('python', "s = 'it\\'s'\nprint(x, end='')\nt = \"\"\"a\\\"\"\"b\"\"\"\n",
+     ["'it\\'s'", "''", '"""a\\"""b"""']),
+])
+def test_string_literals_with_escaped_quotes_are_single_tokens(language, code, literals):
+    tokens = [token for token, start, end in AdvancedTokenizer(language).tokenize_with_spans(code)]
+    assert [token for token in tokens if token[0] in '\'"'] == literals
+
+@pytest.mark.parametrize('language, code', [
+    ('java', "class A {\n    char c = '\\'';\n    String s = \"escaped \\\" quote,x\";\n    String e = \"\";\n}\n"),
+    ('python', "s = 'it\\'s'\nprint(x, end='')\nt = 'a,b'\n"),
+])
+def test_printer_leaves_string_literals_alone(language, code):
+    formatted = CodeFormatter(language=language, engine='printer').format_source(code)['formatted_code']
+    for token, start, end in AdvancedTokenizer(language).tokenize_with_spans(code):
+        if token[0] in '\'"':
+            assert token in formatted
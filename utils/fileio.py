@@ -0,0 +1,194 @@
+import mmap
+import os
+import stat
+
+ZIP_SUFFIXES = ('.zip', '.jar')
+# Tar suffixes and the tarfile compression each stands for
+TAR_SUFFIXES = {'.tar': '', '.tar.gz': 'gz', '.tgz': 'gz', '.tar.bz2': 'bz2', '.tbz2': 'bz2',
+                '.tar.xz': 'xz', '.txz': 'xz'}
+
+def is_archive(path):
+    """Whether path names a zip or tar archive, going by its suffix"""
+    name = path.lower()
+    return name.endswith(ZIP_SUFFIXES) or name.endswith(tuple(TAR_SUFFIXES))
+
+class MappedFile:
+    """A file mapped read-only and decoded as text one slice at a time
+
+    Offsets are byte offsets into the file. text() decodes a slice the way
+    reading the file in text mode would, and release() hands the pages
+    before an offset back to the OS, so a front-to-back pass keeps about
+    one slice resident however large the file is. Slices should end at
+    line ends (see line_end) so no character or line break is split.
+
+        with MappedFile(path) as mapped:
+            end = mapped.line_end(1 << 20)
+            head = mapped.text(0, end)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        # An empty file cannot be mapped
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b''
+        self._released = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def line_end(self, offset):
+        """Offset just past the line break at or after offset (the file size if there is none)"""
+        if offset >= self.size:
+            return self.size
+        found = self._map.find(b'\n', offset)
+        return self.size if found == -1 else found + 1
+
+    def text(self, start, end):
+        """Decoded text of bytes start..end with '\\r\\n' line breaks normalized to '\\n'
+
+        Only '\\r\\n' is normalized, so every '\\n' in the text is one b'\\n'
+        in the file and byte offsets can be found by counting lines.
+        """
+        text = self._map[start:end].decode('utf-8')
+        if '\r' in text:
+            text = text.replace('\r\n', '\n')
+        return text
+
+    def release(self, end):
+        """Drop the pages before end from this process's resident memory"""
+        end -= end % mmap.PAGESIZE
+        if end > self._released and hasattr(mmap, 'MADV_DONTNEED'):
+            self._map.madvise(mmap.MADV_DONTNEED, self._released, end - self._released)
+            self._released = end
+
+    def close(self):
+        if self.size:
+            self._map.close()
+        self._file.close()
+
+def line_ending(stream):
+    """The line ending a text stream has read throughout so far: '\r\n', '\n' or '\r', or None if none or mixed
+
+    Text read with universal newlines has only '\n'; writing it with
+    newline=line_ending(stream) puts the file's own line endings back.
+    """
+    return stream.newlines if isinstance(stream.newlines, str) else None
+
+class AtomicFile:
+    """A temp file next to path that replaces path on commit()
+
+    Readers only ever see the old content or the new, never a partial
+    write. Leaving the block without commit() removes the temp file and
+    leaves path untouched, mtime included. With durable=True commit()
+    also fsyncs the new content; the directory entry still has to be
+    synced (see sync_directories) to survive a crash. file is the open
+    temp file (binary with binary=True), for writers that need more than
+    write(); newline is the line ending each '\n' is written as, as for
+    open() (see line_ending).
+
+        with open(path) as f:
+            code = f.read()
+            newline = line_ending(f)
+        with AtomicFile(path, newline=newline) as f:
+            f.write(format(code))
+            f.commit()
+    """
+
+    def __init__(self, path, durable=False, binary=False, newline=None):
+        import tempfile  # only rewrites need it; keeps it off the cold start
+
+        # Replace what a symlink points to, not the link
+        self.path = os.path.realpath(path)
+        self.durable = durable
+        directory, name = os.path.split(self.path)
+        fd, self.temp_path = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+        self.file = os.fdopen(fd, 'wb' if binary else 'w', newline=newline)
+        self.committed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        if not self.committed:
+            self.file.close()
+            os.unlink(self.temp_path)
+
+    def write(self, data):
+        return self.file.write(data)
+
+    def commit(self):
+        """Move the written content into place, keeping path's permissions; returns its os.stat()"""
+        if self.durable:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.file.close()
+        try:
+            os.chmod(self.temp_path, stat.S_IMODE(os.stat(self.path).st_mode))
+        except FileNotFoundError:
+            pass
+        # Taken before the rename, so it cannot describe a later write by someone else
+        written = os.stat(self.temp_path)
+        os.replace(self.temp_path, self.path)
+        self.committed = True
+        return written
+
+def sync_directories(paths):
+    """fsync the directory of every path, once per directory, so renames into them are durable"""
+    for directory in sorted({os.path.dirname(os.path.realpath(path)) for path in paths}):
+        fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+def shared_memory_dir():
+    """/dev/shm if this system has one, whose files live in memory; else None, the default temp directory"""
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK | os.X_OK):
+        return '/dev/shm'
+    return None
+
+class SharedText:
+    """Text parked in a file of directory, to hand it to another process by path
+
+    Pickling a large string copies it into the pickle and again through
+    the pipe to the other process; a SharedText pickles as its path, and
+    read() decodes the text straight from the file's mapped pages. The
+    file stays until take() removes it, or whoever owns directory (ideally
+    on shared_memory_dir()) does. If it cannot be written (a full
+    /dev/shm raises OSError) no file is left behind.
+
+        shared = SharedText(directory, code)   # in one process
+        code = shared.take()                   # in another
+    """
+
+    def __init__(self, directory, text):
+        import tempfile  # only large texts need it; keeps it off the cold start
+
+        fd, self.path = tempfile.mkstemp(suffix='.txt', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(text.encode('utf-8'))
+        except BaseException:
+            os.unlink(self.path)  # a full /dev/shm must not keep half a text
+            raise
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            # An empty file cannot be mapped
+            if not os.fstat(f.fileno()).st_size:
+                return ''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return str(mapped, 'utf-8')
+
+    def take(self):
+        """read(), then remove the file"""
+        text = self.read()
+        os.unlink(self.path)
+        return text
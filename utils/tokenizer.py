@@ -4,6 +4,7 @@ class AdvancedTokenizer:
     def __init__(self, language='java'):
         self.language = language
         self.patterns = self._get_language_patterns()
+        self._span_regex = None
     
     def _get_language_patterns(self):
         """Get tokenization patterns for each language"""
@@ -39,6 +40,21 @@ class AdvancedTokenizer:
         
         return [token for token in tokens if token.strip()]
     
+    def tokenize_with_spans(self, code):
+        """Tokenize code keeping (token, start, end) offsets into the original text"""
+        if self._span_regex is None:
+            # Strings and block comments may span lines, everything else may not; a
+            # backslash escapes the character after it, quotes included
+            multiline = (r'"""(?:\\.|[^\\])*?"""|\'\'\'(?:\\.|[^\\])*?\'\'\'|'
+                         r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'')
+            if self.language != 'python':
+                multiline = r'/\*.*?\*/|' + multiline
+            self._span_regex = re.compile(f'(?s:{multiline})|{self.patterns}')
+        
+        return [(match.group(), match.start(), match.end())
+                for match in self._span_regex.finditer(code)
+                if match.group().strip()]
+    
     def detokenize(self, tokens):
         """Convert tokens back to code with proper spacing"""
         return ' '.join(tokens)
\ No newline at end of file